@@ -1,66 +1,213 @@
 import pygame
 import math
 import sys
+from collections import OrderedDict
 import numpy as np
 
-# Initialize Pygame and mixer
-pygame.init()
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+from app_context import AppContext
+from audio_stream import AudioStream
+from dirty_rects import DirtyRects
+from doppler_solver import DopplerSolver
+from frame_profiler import FrameProfiler
+from history import StateHistory
+from input_filter import MouseTracker, make_velocity_filter
+from mach_cone import cone_half_angle, cone_polygons, mach_number
+from mixing_bus import MixingBus, voice_gains
+from pressure_field import FIELD_ITERATIONS, PressureField, SourceHistory, field_palette
+from quality import QualityGovernor
+from recording import InputRecorder
+from sim_worker import SimWorker
+from sim_input import InputState
+from text_cache import TextLabel, render_panel, text_cache
 
 # Constants
 WIDTH, HEIGHT = 1000, 600
 FPS = 60
+FIXED_DT = 1.0 / FPS  # Simulation step in seconds
+MAX_STEPS_PER_FRAME = 5  # Catch-up limit after a stall
 BACKGROUND_COLOR = (20, 20, 40)
 SOURCE_COLOR = (255, 100, 100)
 OBSERVER_COLOR = (100, 255, 100)
 WAVE_COLOR = (100, 200, 255)
 TEXT_COLOR = (255, 255, 255)
+EMITTER_COLOR = (255, 180, 80)
+SIREN_COLOR = (230, 100, 230)
+MACH_CONE_COLOR = (255, 220, 120)
+MACH_CONE_DAMAGE_RUN = 4  # outline segments per damage rect
 
 # Physics constants
 SOUND_SPEED = 300  # pixels per second (scaled for visualization)
 BASE_FREQUENCY = 440  # Hz (A4 note)
 WAVE_FREQUENCY = 2  # visual waves per second
 WAVE_LIFETIME = 3000  # milliseconds
+WAVE_STORE_CAPACITY = 16  # initial ring buffer size, grows if needed
+
+# Extra sources and observers
+MAX_EMITTERS = 1000
+MAX_OBSERVERS = 100
+EMITTER_FREQUENCY = 330  # Hz, orbiting emitters added with E
+SIREN_FREQUENCY = 660  # Hz, sirens placed with a click
+OBSERVER_PATROL = 150  # px either side of where a moving observer was placed
+OBSERVER_LABELS = 8  # moving observers that get a frequency readout
+
+# Wave rendering
+RING_RADIUS_STEP = 2  # px per ring sprite bucket
+RING_ALPHA_STEP = 16  # alpha levels per ring sprite bucket
+RING_CACHE_BYTES = 8 * 1024 * 1024  # memory cap for cached ring sprites
+RING_SPRITE_MAX_RADIUS = 96  # larger rings go through the shared overlay
+DIRTY_RECT_UPDATES = True  # Update only the changed parts of the window
+RECORD_INPUTS = False  # Keep every step's input so F5 can save the session for replay; grows all session
+STATE_HISTORY = True  # Keyframes and input so P can pause and LEFT/RIGHT rewind
+# Physics and audio in a worker process, so drawing and sound never stall
+# each other (input recording and history are off in this mode)
+SIM_WORKER = False
+# Source positions kept for the pressure field: long enough for sound to
+# cross the window diagonally
+SOURCE_HISTORY_STEPS = math.ceil(math.hypot(WIDTH, HEIGHT) / SOUND_SPEED * FPS) + 2
+
+# Rendering detail the quality governor steps through when frames run over
+# budget, best first. ring_limit keeps only the newest rings (None = all)
+QUALITY_TIERS = [
+    {"name": "high", "ring_limit": None, "ring_alpha_step": RING_ALPHA_STEP,
+     "observer_labels": OBSERVER_LABELS, "field_iterations": FIELD_ITERATIONS},
+    {"name": "medium", "ring_limit": 24, "ring_alpha_step": 32,
+     "observer_labels": 4, "field_iterations": 5},
+    {"name": "low", "ring_limit": 12, "ring_alpha_step": 64,
+     "observer_labels": 2, "field_iterations": 4},
+    {"name": "minimum", "ring_limit": 6, "ring_alpha_step": 128,
+     "observer_labels": 0, "field_iterations": 4},
+]
+ADAPTIVE_QUALITY = True  # Let the governor lower detail to hold the frame rate
+
+# Audio constants
+MIXER_SETTINGS = {"frequency": 44100, "size": -16, "channels": 2, "buffer": 512}
+TONE_CACHE_SIZE = 64  # ready-made tone buffers kept by SoundGenerator
+TONE_CACHE_STEP = 0.5  # Hz per cache bucket
+AUDIO_STREAMING = True  # Mixed, phase-continuous stream instead of restarted loops
+
+# Info panel; the empty rows FREQUENCY_ROW, SPEED_ROW and QUALITY_ROW hold live readouts
+INFO_LINE_HEIGHT = 18
+INFO_LINES = [
+    "Interactive Doppler Effect Visualization",
+    "Move your mouse to control the sound source!",
+    "",
+    "Red circle: Sound source (follows cursor)",
+    "Green circle: Observer (stationary)",
+    "Blue rings: Sound waves",
+    "",
+    f"Base frequency: {BASE_FREQUENCY:.1f} Hz",
+    "",
+    "",
+    "",
+    "Controls:",
+    "S - Toggle sound on/off",
+    "R - Reset observer position",
+    "Click - Place siren, E - Add orbiting emitter",
+    "O - Add moving observer, C - Clear extras",
+    "F - Pressure field view",
+    "P - Pause, then LEFT/RIGHT to scrub (SHIFT faster)",
+    "F3 - Profiler overlay, F4 - Save frame trace, F5 - Save inputs",
+    "ESC - Exit",
+]
+FREQUENCY_ROW = 8
+SPEED_ROW = 9
+QUALITY_ROW = 10
 
 
 class SoundGenerator:
-    def __init__(self):
-        self.sample_rate = 44100
+    def __init__(self, cache_size=TONE_CACHE_SIZE, cache_step=TONE_CACHE_STEP, streaming=False):
+        self.sample_rate = MIXER_SETTINGS["frequency"]
         self.base_freq = BASE_FREQUENCY
         self.current_freq = BASE_FREQUENCY
         self.phase = 0
         self.is_playing = False
 
+        # Streaming mode: every source mixed on one bus, rendered by a
+        # background producer thread into a single channel
+        self.streaming = streaming
+        self.bus = None
+        self.stream = None
+        self.loop_sound = None  # The looping Sound of non-streaming mode
+
+        # LRU cache of pygame Sounds keyed on quantized frequency
+        self.cache_size = cache_size
+        self.cache_step = cache_step
+        self.tone_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def generate_tone(self, frequency, duration_ms=100):
         """Generate a sine wave tone at the specified frequency"""
         frames = int(duration_ms * self.sample_rate / 1000)
-        arr = np.zeros((frames, 2))  # Stereo
+        samples = np.sin(2 * np.pi * frequency * np.arange(frames) / self.sample_rate) * 0.3
+        mono = (samples * 32767).astype(np.int16)
+        return np.repeat(mono[:, np.newaxis], 2, axis=1)  # Stereo
+
+    def get_tone_sound(self, frequency, duration_ms=200):
+        """Return a ready Sound for the frequency, reusing cached buffers"""
+        bucket = int(round(frequency / self.cache_step))
+        key = (bucket, duration_ms)
+
+        sound = self.tone_cache.get(key)
+        if sound is not None:
+            self.tone_cache.move_to_end(key)
+            self.cache_hits += 1
+            return sound
 
-        for i in range(frames):
-            # Simple sine wave
-            sample = np.sin(2 * np.pi * frequency * i / self.sample_rate) * 0.3
-            arr[i] = [sample, sample]
+        self.cache_misses += 1
+        sound = pygame.sndarray.make_sound(self.generate_tone(bucket * self.cache_step, duration_ms))
+        if self.cache_size > 0:
+            self.tone_cache[key] = sound
+            while len(self.tone_cache) > self.cache_size:
+                self.tone_cache.popitem(last=False)  # Evict least recently used
+        return sound
 
-        return (arr * 32767).astype(np.int16)
+    def clear_cache(self):
+        """Drop all cached tone buffers"""
+        self.tone_cache.clear()
 
     def update_frequency(self, new_freq):
         """Update the frequency for the Doppler effect"""
         self.current_freq = max(50, min(2000, new_freq))  # Clamp frequency
 
+    def _ensure_bus(self):
+        if self.bus is None:
+            self.bus = MixingBus(self.sample_rate)
+            self.stream = AudioStream(self.bus)
+
+    def update_voices(self, frequencies, offsets_x, distances):
+        """Retarget the streamed mix: one voice per source, first voice is
+        the main one. Offsets and distances are from the listener."""
+        self._ensure_bus()
+        frequencies = np.clip(frequencies, 50, 2000)
+        self.current_freq = float(frequencies[0])
+        self.bus.set_voices(frequencies, voice_gains(offsets_x, distances))
+
+    def start_stream(self):
+        """Start the streamed mix, or start it again if its thread has died"""
+        if not self.is_playing or not self.stream.is_running:
+            self._ensure_bus()
+            self.stream.start()
+            self.is_playing = True
+
     def play_continuous_tone(self):
         """Play a continuous tone that can be updated"""
         if not self.is_playing:
-            # Generate a short tone buffer
-            tone_data = self.generate_tone(self.current_freq, 200)
-            sound = pygame.sndarray.make_sound(tone_data)
+            # Fetch a short tone buffer (cached per frequency bucket)
+            sound = self.get_tone_sound(self.current_freq, 200)
             sound.play(-1)  # Loop indefinitely
+            self.loop_sound = sound
             self.is_playing = True
             return sound
         return None
 
     def stop(self):
-        """Stop all sounds"""
-        pygame.mixer.stop()
+        """Stop our sounds, leaving the rest of the mixer alone"""
+        if self.stream is not None:
+            self.stream.stop()
+        if self.loop_sound is not None:
+            self.loop_sound.stop()
+            self.loop_sound = None
         self.is_playing = False
 
 
@@ -95,133 +242,467 @@ class SoundWave:
                                            self.center_y - self.radius - 2))
 
 
-class DopplerSimulation:
+class RingSpriteCache:
+    """Pre-rendered ring outlines keyed by quantized radius and alpha.
+
+    Sprites are evicted least recently used first once their total size
+    passes max_bytes. Rings above max_radius are not cached (get() returns
+    None) and should be drawn into a shared overlay instead.
+    """
+
+    def __init__(self, color=WAVE_COLOR, max_bytes=RING_CACHE_BYTES,
+                 radius_step=RING_RADIUS_STEP, alpha_step=RING_ALPHA_STEP,
+                 max_radius=RING_SPRITE_MAX_RADIUS, width=2):
+        self.color = color
+        self.max_bytes = max_bytes
+        self.radius_step = radius_step
+        self.alpha_step = alpha_step
+        self.max_radius = max_radius
+        self.width = width
+        self.sprites = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, radius, alpha):
+        radius_q = int(round(radius / self.radius_step)) * self.radius_step
+        alpha_q = min(255, int(alpha) // self.alpha_step * self.alpha_step)
+        return radius_q, alpha_q
+
+    def get(self, radius, alpha):
+        """Return the sprite for a ring, or None if it is too large to cache"""
+        radius_q, alpha_q = self.quantize(radius, alpha)
+        if radius_q > self.max_radius or radius_q <= 2:
+            return None
+
+        key = (radius_q, alpha_q)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        size = radius_q * 2 + 4
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*self.color, alpha_q),
+                           (radius_q + 2, radius_q + 2), radius_q, self.width)
+        self.sprites[key] = sprite
+        self.bytes_used += size * size * 4
+        while self.bytes_used > self.max_bytes and len(self.sprites) > 1:
+            _, evicted = self.sprites.popitem(last=False)
+            self.bytes_used -= evicted.get_width() * evicted.get_height() * 4
+        return sprite
+
+    def clear(self):
+        self.sprites.clear()
+        self.bytes_used = 0
+
+
+class WaveStore:
+    """Live waves kept as ring buffers of center x, center y and birth time.
+
+    Waves must be pushed in birth order, so expired waves always sit at the
+    head of the ring and are dropped by advancing the head index.
+    """
+
+    def __init__(self, capacity=WAVE_STORE_CAPACITY):
+        self.capacity = capacity
+        self.center_x = np.zeros(capacity)
+        self.center_y = np.zeros(capacity)
+        self.birth_time = np.zeros(capacity)
+        self.head = 0
+        self.count = 0
+
+        # Per-wave values for the live waves in birth order, set by update()
+        self.age = np.zeros(0)
+        self.radius = np.zeros(0)
+        self.alpha = np.zeros(0)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Thin SoundWave views for code that still works per wave
+        idx = self.live_indices()
+        for i, slot in enumerate(idx):
+            wave = SoundWave(self.center_x[slot], self.center_y[slot], self.birth_time[slot])
+            if i < len(self.radius):
+                wave.radius = self.radius[i]
+            yield wave
+
+    def live_indices(self):
+        """Ring slots of the live waves, oldest first"""
+        return (self.head + np.arange(self.count)) % self.capacity
+
+    def push(self, x, y, birth_time):
+        if self.count == self.capacity:
+            self._grow()
+        slot = (self.head + self.count) % self.capacity
+        self.center_x[slot] = x
+        self.center_y[slot] = y
+        self.birth_time[slot] = birth_time
+        self.count += 1
+
+    def append(self, wave):
+        """Add a SoundWave (list-style compatibility)"""
+        self.push(wave.center_x, wave.center_y, wave.birth_time)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.age = self.radius = self.alpha = np.zeros(0)
+
+    def _grow(self):
+        idx = self.live_indices()
+        new_capacity = self.capacity * 2
+        for name in ("center_x", "center_y", "birth_time"):
+            grown = np.zeros(new_capacity)
+            grown[:self.count] = getattr(self, name)[idx]
+            setattr(self, name, grown)
+        self.capacity = new_capacity
+        self.head = 0
+
+    def update(self, current_time):
+        """Compute radius, alpha and expiry for every live wave in one pass"""
+        idx = self.live_indices()
+        age = current_time - self.birth_time[idx]
+
+        # Ages fall from head to tail, so the expired waves form a prefix
+        expired = int(np.count_nonzero(age >= WAVE_LIFETIME))
+        if expired:
+            self.head = (self.head + expired) % self.capacity
+            self.count -= expired
+            age = age[expired:]
+
+        self.age = age
+        self.radius = (age / 1000.0) * SOUND_SPEED
+        self.alpha = np.maximum(0, 255 - (age / WAVE_LIFETIME) * 255)
+
+
+class MoverStore:
+    """Scripted point movers (extra sources or observers) kept as columns.
+
+    Mover k sits at anchor + (rx cos(w t + phase), ry sin(w t + phase)):
+    an orbit when rx == ry, a back-and-forth patrol when ry == 0 and a
+    fixed point when both are 0. update(t) fills position and velocity.
+    """
+
+    def __init__(self):
+        self.anchor = np.zeros((0, 2))
+        self.rx = np.zeros(0)
+        self.ry = np.zeros(0)
+        self.omega = np.zeros(0)  # rad/s
+        self.phase = np.zeros(0)
+        self.frequency = np.zeros(0)  # Hz, for sources
+        self.position = np.zeros((0, 2))
+        self.velocity = np.zeros((0, 2))
+
+    def __len__(self):
+        return len(self.rx)
+
+    def add(self, x, y, rx=0.0, ry=0.0, omega=0.0, phase=0.0, frequency=BASE_FREQUENCY):
+        # Movers are added by hand a few at a time, so plain appends will do
+        self.anchor = np.vstack((self.anchor, [x, y]))
+        self.rx = np.append(self.rx, rx)
+        self.ry = np.append(self.ry, ry)
+        self.omega = np.append(self.omega, omega)
+        self.phase = np.append(self.phase, phase)
+        self.frequency = np.append(self.frequency, frequency)
+        self.position = np.vstack((self.position, [x + rx * math.cos(phase), y + ry * math.sin(phase)]))
+        self.velocity = np.vstack((self.velocity, [0.0, 0.0]))
+
+    def clear(self):
+        self.__init__()
+
+    def update(self, t):
+        """Move every mover to time t (seconds)"""
+        if not len(self.rx):
+            return
+        angle = self.omega * t + self.phase
+        cos = np.cos(angle)
+        sin = np.sin(angle)
+        self.position[:, 0] = self.anchor[:, 0] + self.rx * cos
+        self.position[:, 1] = self.anchor[:, 1] + self.ry * sin
+        self.velocity[:, 0] = -self.rx * self.omega * sin
+        self.velocity[:, 1] = self.ry * self.omega * cos
+
+
+class DopplerCore:
+    """Headless Doppler simulation: source, observer, waves and pitch.
+
+    Advanced only through step(dt, input_state), so it never touches the
+    display, the mouse or the clock and can run faster than real time.
+    """
+
+    # The attributes step() reads and writes; history.StateHistory keyframes these
+    HISTORY_FIELDS = ("sim_time", "source_x", "source_y", "source_velocity_x", "source_velocity_y",
+                      "velocity_filter", "observer_x", "observer_y", "waves", "last_wave_time",
+                      "source_history", "emitters", "observers", "frequencies", "heard",
+                      "observed_frequency")
+
     def __init__(self):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Interactive Doppler Effect - Move your mouse!")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font(None, 24)
-        self.small_font = pygame.font.Font(None, 18)
+        # Simulation clock in milliseconds
+        self.sim_time = 0.0
 
         # Source properties (follows cursor)
         self.source_x = WIDTH // 2
         self.source_y = HEIGHT // 2
-        self.prev_source_x = self.source_x
-        self.prev_source_y = self.source_y
         self.source_velocity_x = 0
         self.source_velocity_y = 0
+        self.velocity_filter = make_velocity_filter()  # For inputs without a velocity
 
         # Observer position (stationary)
         self.observer_x = WIDTH - 150
         self.observer_y = HEIGHT // 2
 
         # Wave management
-        self.waves = []
+        self.waves = WaveStore()
         self.last_wave_time = 0
         self.wave_interval = 1000 / WAVE_FREQUENCY  # milliseconds between waves
+        self.source_history = SourceHistory(SOURCE_HISTORY_STEPS)
+
+        # Extra sources (orbiting emitters, sirens) and moving observers
+        self.emitters = MoverStore()
+        self.observers = MoverStore()
+
+        # Frequency calculation. Row 0 of frequencies is the cursor source
+        # and column 0 the main observer; heard[m] is what observer m hears
+        # from its nearest source
+        self.solver = DopplerSolver(SOUND_SPEED)
+        self.frequencies = np.full((1, 1), float(BASE_FREQUENCY))
+        self.heard = np.full(1, float(BASE_FREQUENCY))
+        self.observed_frequency = BASE_FREQUENCY
+
+        # Optional FrameProfiler; step() marks its phases when one is set
+        self.profiler = None
+
+    def step(self, dt, input_state):
+        """Advance the simulation by dt seconds"""
+        self.sim_time += dt * 1000.0
+
+        for key in input_state.keys_down:
+            if key == pygame.K_r:
+                self.reset_observer()
+            elif key == pygame.K_SPACE:
+                self.waves.clear()
+                self.source_history.clear()
+            elif key == pygame.K_e:
+                self.add_emitter(*input_state.mouse_pos)
+            elif key == pygame.K_o:
+                self.add_observer(*input_state.mouse_pos)
+            elif key == pygame.K_c:
+                self.emitters.clear()
+                self.observers.clear()
+        for button in input_state.buttons_down:
+            if button == 1:
+                self.add_siren(*input_state.mouse_pos)
+
+        self.update_source_position(input_state.mouse_pos, input_state.mouse_velocity)
+        t = self.sim_time / 1000.0
+        self.source_history.push(t, self.source_x, self.source_y)
+        self.emitters.update(t)
+        self.observers.update(t)
+        self.calculate_observed_frequency()
+        if self.profiler:
+            self.profiler.mark("physics")
+        self.emit_wave(self.sim_time)
+        self.update_waves(self.sim_time)
+        if self.profiler:
+            self.profiler.mark("update_waves")
+
+    def reset_observer(self):
+        self.observer_x = WIDTH - 150
+        self.observer_y = HEIGHT // 2
+
+    def add_emitter(self, x, y):
+        """Emitter orbiting (x, y); successive ones vary radius and direction"""
+        k = len(self.emitters)
+        if k < MAX_EMITTERS:
+            radius = 60 + 20 * (k % 5)
+            omega = (1.5 if k % 2 == 0 else -1.5) * (1 + 0.1 * (k % 3))
+            self.emitters.add(x, y, radius, radius, omega, self.sim_time / 1000.0, EMITTER_FREQUENCY)
+
+    def add_siren(self, x, y):
+        if len(self.emitters) < MAX_EMITTERS:
+            self.emitters.add(x, y, frequency=SIREN_FREQUENCY)
+
+    def add_observer(self, x, y):
+        """Observer patrolling left and right around (x, y)"""
+        if len(self.observers) < MAX_OBSERVERS:
+            self.observers.add(x, y, rx=OBSERVER_PATROL, omega=1.0)
+
+    def update_source_position(self, mouse_pos, mouse_velocity=None):
+        mouse_x, mouse_y = mouse_pos
+
+        # Live input brings a velocity filtered from every motion event;
+        # otherwise filter this step's position on the simulation clock
+        if mouse_velocity is None:
+            self.velocity_filter.add(self.sim_time / 1000.0, mouse_x, mouse_y)
+            mouse_velocity = self.velocity_filter.velocity
+        self.source_velocity_x, self.source_velocity_y = mouse_velocity
+
+        # Update position
+        self.source_x = mouse_x
+        self.source_y = mouse_y
+
+    def calculate_observed_frequency(self):
+        emitters = self.emitters
+        observers = self.observers
+        if not len(emitters) and not len(observers):
+            # Just the cursor source and the main observer
+            self.observed_frequency = self.solver.solve_pair(
+                (self.source_x, self.source_y), (self.source_velocity_x, self.source_velocity_y),
+                BASE_FREQUENCY, (self.observer_x, self.observer_y))
+            self.frequencies = np.full((1, 1), float(self.observed_frequency))
+            self.heard = self.frequencies[0]
+            return
+
+        # Every source against every observer in one pass
+        source_pos = np.vstack(([self.source_x, self.source_y], emitters.position))
+        source_vel = np.vstack(([self.source_velocity_x, self.source_velocity_y], emitters.velocity))
+        base = np.append(BASE_FREQUENCY, emitters.frequency)
+        observer_pos = np.vstack(([self.observer_x, self.observer_y], observers.position))
+        observer_vel = np.vstack(([0.0, 0.0], observers.velocity))
+
+        self.frequencies = self.solver.solve(source_pos, source_vel, base, observer_pos, observer_vel)
+        self.observed_frequency = float(self.frequencies[0, 0])
+        if len(base) > 1:
+            nearest = np.argmin(self.solver.distance, axis=0)
+            self.heard = self.frequencies[nearest, np.arange(len(observer_pos))]
+        else:
+            self.heard = self.frequencies[0]
+
+    def voice_geometry(self):
+        """What the main observer hears from each source, cursor first:
+        (frequencies, horizontal offsets, distances)"""
+        offsets_x = np.append(self.source_x, self.emitters.position[:, 0]) - self.observer_x
+        offsets_y = np.append(self.source_y, self.emitters.position[:, 1]) - self.observer_y
+        return self.frequencies[:, 0], offsets_x, np.hypot(offsets_x, offsets_y)
+
+    def emit_wave(self, current_time):
+        if current_time - self.last_wave_time >= self.wave_interval:
+            self.waves.push(self.source_x, self.source_y, current_time)
+            self.last_wave_time = current_time
+
+    def update_waves(self, current_time):
+        # Update existing waves and drop expired ones in a single pass
+        self.waves.update(current_time)
+
+
+class DopplerSimulation(DopplerCore):
+    """Interactive window: renders a DopplerCore and plays its pitch"""
+
+    def __init__(self, app=None):
+        super().__init__()
+        # Window, fonts and mixer come up here or on first use, not on import
+        self.app = app or AppContext((WIDTH, HEIGHT), "Interactive Doppler Effect - Move your mouse!",
+                                     MIXER_SETTINGS)
+        self.screen = self.app.screen
+        self.clock = self.app.clock
+        self.font = self.app.font(24)
+        self.small_font = self.app.font(18)
+
+        # HUD text: static lines composited once, readouts re-rendered on change
+        self.info_panel = render_panel(self.small_font, INFO_LINES, TEXT_COLOR, INFO_LINE_HEIGHT)
+        self.frequency_label = TextLabel(self.small_font)
+        self.speed_label = TextLabel(self.small_font)
+        self.effect_label = TextLabel(self.font)
+        self.distance_label = TextLabel(self.small_font)
+        self.quality_label = TextLabel(self.small_font)
+        self.history_label = TextLabel(self.small_font)
+
+        # Wave rendering: cached ring sprites plus one shared overlay for big rings
+        self.ring_sprites = RingSpriteCache()
+        self.wave_overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+
+        # Pressure-field heatmap in place of the rings, built on first use
+        self.show_field = False
+        self.pressure_field = None
+
+        # Detail drops a tier at a time while frames run over budget
+        self.quality = QualityGovernor(QUALITY_TIERS, FPS, adaptive=ADAPTIVE_QUALITY)
+        self.apply_quality(self.quality.settings)
+
+        # Frames restore last frame's drawing from the background and
+        # present only what changed
+        background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        background.fill(BACKGROUND_COLOR)
+        self.dirty = DirtyRects(self.screen, background, DIRTY_RECT_UPDATES)
 
         # Sound management
-        self.sound_generator = SoundGenerator()
+        self.sound_generator = SoundGenerator(streaming=AUDIO_STREAMING)
         self.current_sound = None
         self.last_sound_update = 0
         self.sound_update_interval = 50  # Update sound every 50ms
-
-        # Frequency calculation
-        self.observed_frequency = BASE_FREQUENCY
         self.sound_enabled = True
 
-    def update_source_position(self, dt):
-        # Get mouse position
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        # Cursor velocity from every motion event, not one sample per frame
+        self.mouse_tracker = MouseTracker()
 
-        # Calculate velocity based on position change
-        self.source_velocity_x = (mouse_x - self.prev_source_x) / dt if dt > 0 else 0
-        self.source_velocity_y = (mouse_y - self.prev_source_y) / dt if dt > 0 else 0
+        # The session's input from the first step, for F5 to save
+        self.recorder = InputRecorder("doppler") if RECORD_INPUTS and not SIM_WORKER else None
 
-        # Update position
-        self.prev_source_x = self.source_x
-        self.prev_source_y = self.source_y
-        self.source_x = mouse_x
-        self.source_y = mouse_y
+        # Past steps to pause on and rewind to
+        self.history = StateHistory(self, FPS) if STATE_HISTORY and not SIM_WORKER else None
 
-    def calculate_observed_frequency(self):
-        # Calculate distance and relative velocity toward observer
-        dx = self.observer_x - self.source_x
-        dy = self.observer_y - self.source_y
-        distance = math.sqrt(dx * dx + dy * dy)
-
-        if distance > 0:
-            # Unit vector from source to observer
-            ux = dx / distance
-            uy = dy / distance
-
-            # Component of source velocity toward observer (dot product)
-            relative_velocity = self.source_velocity_x * ux + self.source_velocity_y * uy
-
-            # Apply Doppler formula: f' = f * (v_sound) / (v_sound - v_source)
-            denominator = SOUND_SPEED - relative_velocity
-            if abs(denominator) > 0.1:  # Avoid division by zero
-                self.observed_frequency = BASE_FREQUENCY * SOUND_SPEED / denominator
-            else:
-                self.observed_frequency = BASE_FREQUENCY * 10  # Very high frequency
+        # Started by run() when SIM_WORKER is set
+        self.worker = None
 
-            # Clamp to reasonable range
-            self.observed_frequency = max(100, min(1000, self.observed_frequency))
-        else:
-            self.observed_frequency = BASE_FREQUENCY
+        # Per-phase frame timing (F3 overlay, F4 trace export)
+        self.profiler = FrameProfiler(
+            ["idle", "events", "physics", "update_waves", "update_sound", "draw", "flip"], FPS)
 
     def update_sound(self, current_time):
-        if self.sound_enabled and current_time - self.last_sound_update > self.sound_update_interval:
+        if self.sound_enabled:
+            self.app.init_mixer()
+        if self.sound_enabled and self.sound_generator.streaming:
+            # Only hand the new voices to the producer thread; it glides there
+            self.sound_generator.update_voices(*self.voice_geometry())
+            self.sound_generator.start_stream()
+        elif self.sound_enabled and current_time - self.last_sound_update > self.sound_update_interval:
             # Stop current sound and start new one with updated frequency
             self.sound_generator.stop()
             self.sound_generator.update_frequency(self.observed_frequency)
             self.current_sound = self.sound_generator.play_continuous_tone()
             self.last_sound_update = current_time
 
-    def emit_wave(self, current_time):
-        if current_time - self.last_wave_time >= self.wave_interval:
-            self.waves.append(SoundWave(self.source_x, self.source_y, current_time))
-            self.last_wave_time = current_time
-
-    def update_waves(self, current_time):
-        # Update existing waves
-        for wave in self.waves[:]:
-            wave.update(current_time)
-            if not wave.is_alive(current_time):
-                self.waves.remove(wave)
+    def apply_quality(self, settings):
+        """Switch rendering detail to one of the QUALITY_TIERS"""
+        self.ring_limit = settings["ring_limit"]
+        self.observer_labels = settings["observer_labels"]
+        self.field_iterations = settings["field_iterations"]
+        if self.pressure_field is not None:
+            self.pressure_field.iterations = self.field_iterations
+        if self.ring_sprites.alpha_step != settings["ring_alpha_step"]:
+            self.ring_sprites.alpha_step = settings["ring_alpha_step"]
+            self.ring_sprites.clear()
 
     def draw_info(self):
-        # Instructions
-        instructions = [
-            "Interactive Doppler Effect Visualization",
-            "Move your mouse to control the sound source!",
-            "",
-            "Red circle: Sound source (follows cursor)",
-            "Green circle: Observer (stationary)",
-            "Blue rings: Sound waves",
-            "",
-            f"Base frequency: {BASE_FREQUENCY:.1f} Hz",
-            f"Observed frequency: {self.observed_frequency:.1f} Hz",
-            f"Source speed: {math.sqrt(self.source_velocity_x ** 2 + self.source_velocity_y ** 2):.1f} px/s",
-            "",
-            "Controls:",
-            "S - Toggle sound on/off",
-            "R - Reset observer position",
-            "ESC - Exit",
-        ]
-
-        y_offset = 10
-        for line in instructions:
-            if line:  # Skip empty lines
-                text = self.small_font.render(line, True, TEXT_COLOR)
-                self.screen.blit(text, (10, y_offset))
-            y_offset += 18
+        # Instructions, with the live readouts in their reserved rows
+        dirty = self.dirty
+        dirty.add(self.screen.blit(self.info_panel, (10, 10)))
+        frequency_text = f"Observed frequency: {self.observed_frequency:.1f} Hz"
+        speed = math.sqrt(self.source_velocity_x ** 2 + self.source_velocity_y ** 2)
+        mach = mach_number(self.source_velocity_x, self.source_velocity_y, SOUND_SPEED)
+        cone_angle = cone_half_angle(mach)
+        mach_text = f"Mach {mach:.2f}" if cone_angle is None else f"Mach {mach:.2f}, cone half-angle {cone_angle:.1f} deg"
+        speed_text = f"Source speed: {speed:.1f} px/s ({mach_text})"
+        dirty.add(self.screen.blit(self.frequency_label.render(frequency_text, TEXT_COLOR),
+                                   (10, 10 + FREQUENCY_ROW * INFO_LINE_HEIGHT)))
+        dirty.add(self.screen.blit(self.speed_label.render(speed_text, TEXT_COLOR),
+                                   (10, 10 + SPEED_ROW * INFO_LINE_HEIGHT)))
+        dirty.add(self.screen.blit(self.quality_label.render(f"Quality: {self.quality.name}", TEXT_COLOR),
+                                   (10, 10 + QUALITY_ROW * INFO_LINE_HEIGHT)))
 
         # Show sound status
         sound_status = "Sound: ON" if self.sound_enabled else "Sound: OFF"
         sound_color = (100, 255, 100) if self.sound_enabled else (255, 100, 100)
-        sound_surface = self.font.render(sound_status, True, sound_color)
-        self.screen.blit(sound_surface, (10, HEIGHT - 60))
+        sound_surface = text_cache.render(self.font, sound_status, True, sound_color)
+        dirty.add(self.screen.blit(sound_surface, (10, HEIGHT - 60)))
+        if self.history is not None and self.history.paused:
+            dirty.add(self.screen.blit(self.history_label.render(self.history.status(), TEXT_COLOR),
+                                       (10, HEIGHT - 85)))
 
         # Show Doppler effect explanation
         freq_diff = self.observed_frequency - BASE_FREQUENCY
@@ -235,32 +716,125 @@ class DopplerSimulation:
             effect_text = "Normal pitch"
             color = TEXT_COLOR
 
-        effect_surface = self.font.render(effect_text, True, color)
-        self.screen.blit(effect_surface, (10, HEIGHT - 30))
+        effect_surface = self.effect_label.render(effect_text, color)
+        dirty.add(self.screen.blit(effect_surface, (10, HEIGHT - 30)))
+
+    def draw_waves(self):
+        waves = self.waves
+        idx = waves.live_indices()
+        overlay_rect = None
+
+        # Over the ring limit, the oldest (faintest, largest) rings go first
+        skip = 0 if self.ring_limit is None else max(0, len(idx) - self.ring_limit)
+        for x, y, radius, alpha in zip(waves.center_x[idx[skip:]], waves.center_y[idx[skip:]],
+                                       waves.radius[skip:], waves.alpha[skip:]):
+            if radius <= 2:
+                continue
+            sprite = self.ring_sprites.get(radius, alpha)
+            if sprite is not None:
+                offset = sprite.get_width() // 2
+                self.dirty.add(self.screen.blit(sprite, (x - offset, y - offset)))
+            else:
+                rect = pygame.draw.circle(self.wave_overlay, (*WAVE_COLOR, int(alpha)),
+                                          (x, y), int(radius), 2)
+                overlay_rect = rect if overlay_rect is None else overlay_rect.union(rect)
+
+        # Composite all large rings with a single blit, then clear what we used
+        if overlay_rect is not None:
+            self.dirty.add(self.screen.blit(self.wave_overlay, overlay_rect.topleft, overlay_rect))
+            self.wave_overlay.fill((0, 0, 0, 0), overlay_rect)
+
+    def draw_mach_cone(self):
+        """Shock front of a source outrunning its sound, from its recent path.
+
+        Only the two flanks are drawn, opaque and straight onto the screen:
+        filling the cone through the alpha overlay meant compositing most of
+        the window every supersonic frame.
+        """
+        for polygon in cone_polygons(*self.source_history.window(), self.sim_time / 1000.0, SOUND_SPEED):
+            # Open outline: one flank to the apex and the other back
+            pygame.draw.lines(self.screen, MACH_CONE_COLOR, False, polygon.tolist(), 2)
+            # Damage each short stretch of the outline, not the bounding box
+            # of the whole cone, which next frame's erase would restore
+            for start in range(0, len(polygon) - 1, MACH_CONE_DAMAGE_RUN):
+                run = polygon[start:start + MACH_CONE_DAMAGE_RUN + 1]
+                (left, top), (right, bottom) = run.min(axis=0), run.max(axis=0)
+                self.dirty.add(pygame.Rect(left - 2, top - 2, right - left + 5, bottom - top + 5))
+
+    def draw_extras(self):
+        dirty = self.dirty
+        emitters = self.emitters
+        for (x, y), rx in zip(emitters.position.astype(int).tolist(), emitters.rx.tolist()):
+            color = SIREN_COLOR if rx == 0 else EMITTER_COLOR
+            dirty.add(pygame.draw.circle(self.screen, color, (x, y), 5))
+
+        # Moving observers, the first few labelled with what they hear
+        for k, (x, y) in enumerate(self.observers.position.astype(int).tolist()):
+            dirty.add(pygame.draw.circle(self.screen, OBSERVER_COLOR, (x, y), 8, 2))
+            if k < self.observer_labels:
+                label = text_cache.render(self.small_font, f"{self.heard[k + 1]:.0f} Hz", True, OBSERVER_COLOR)
+                dirty.add(self.screen.blit(label, (x - label.get_width() // 2, y + 10)))
 
     def draw(self, current_time):
-        self.screen.fill(BACKGROUND_COLOR)
+        self.render_scene()
+        self.dirty.add(self.profiler.draw_overlay(self.screen, self.small_font, (WIDTH, 0)))
+        self.profiler.mark("draw")
+
+        self.dirty.present()
+        self.profiler.mark("flip")
+
+    def toggle_pause(self):
+        """Pause, or resume from the tick scrubbed to; what came after it
+        is dropped from the history and the input recording"""
+        if self.history.paused:
+            self.history.resume()
+            if self.recorder is not None:
+                self.recorder.truncate(self.history.end)
+            # sim_time may have gone back; retune the looped tone at the next step
+            self.last_sound_update = float("-inf")
+        else:
+            self.history.pause()
+            self.sound_generator.stop()
+
+    def toggle_field(self):
+        self.show_field = not self.show_field
+        if self.show_field and self.pressure_field is None:
+            palette = field_palette(BACKGROUND_COLOR, WAVE_COLOR, SOURCE_COLOR)
+            self.pressure_field = PressureField((WIDTH, HEIGHT), SOUND_SPEED, palette,
+                                                iterations=self.field_iterations)
+        self.dirty.invalidate()
+
+    def render_scene(self):
+        """Draw the simulation into self.screen without presenting it"""
+        dirty = self.dirty
+
+        # Draw waves: the pressure field covers the whole window, so it
+        # replaces erasing as well as the rings
+        if self.show_field:
+            dirty.add(self.pressure_field.render(self.screen, self.sim_time / 1000.0, self.source_history))
+        else:
+            dirty.erase()
+            self.draw_waves()
 
-        # Draw waves
-        for wave in self.waves:
-            wave.draw(self.screen, current_time)
+        # Shock front over either view once the source outruns its sound
+        self.draw_mach_cone()
 
         # Draw line between source and observer
-        pygame.draw.line(self.screen, (80, 80, 80),
-                         (int(self.source_x), int(self.source_y)),
-                         (int(self.observer_x), int(self.observer_y)), 1)
+        dirty.add(pygame.draw.line(self.screen, (80, 80, 80),
+                                   (int(self.source_x), int(self.source_y)),
+                                   (int(self.observer_x), int(self.observer_y)), 1))
 
         # Draw distance text
         distance = math.sqrt((self.observer_x - self.source_x) ** 2 + (self.observer_y - self.source_y) ** 2)
         dist_text = f"{distance:.0f}px"
-        text_surface = self.small_font.render(dist_text, True, (150, 150, 150))
+        text_surface = self.distance_label.render(dist_text, (150, 150, 150))
         mid_x = (self.source_x + self.observer_x) // 2
         mid_y = (self.source_y + self.observer_y) // 2
-        self.screen.blit(text_surface, (mid_x - 20, mid_y - 20))
+        dirty.add(self.screen.blit(text_surface, (mid_x - 20, mid_y - 20)))
 
         # Draw source (follows cursor)
-        pygame.draw.circle(self.screen, SOURCE_COLOR,
-                           (int(self.source_x), int(self.source_y)), 15)
+        dirty.add(pygame.draw.circle(self.screen, SOURCE_COLOR,
+                                     (int(self.source_x), int(self.source_y)), 15))
         pygame.draw.circle(self.screen, (255, 255, 255),
                            (int(self.source_x), int(self.source_y)), 15, 2)
 
@@ -268,61 +842,118 @@ class DopplerSimulation:
         if math.sqrt(self.source_velocity_x ** 2 + self.source_velocity_y ** 2) > 10:
             end_x = self.source_x + self.source_velocity_x * 0.1
             end_y = self.source_y + self.source_velocity_y * 0.1
-            pygame.draw.line(self.screen, (255, 200, 100),
-                             (int(self.source_x), int(self.source_y)),
-                             (int(end_x), int(end_y)), 3)
+            dirty.add(pygame.draw.line(self.screen, (255, 200, 100),
+                                       (int(self.source_x), int(self.source_y)),
+                                       (int(end_x), int(end_y)), 3))
 
         # Draw observer (stationary)
-        pygame.draw.circle(self.screen, OBSERVER_COLOR,
-                           (int(self.observer_x), int(self.observer_y)), 12)
+        dirty.add(pygame.draw.circle(self.screen, OBSERVER_COLOR,
+                                     (int(self.observer_x), int(self.observer_y)), 12))
         pygame.draw.circle(self.screen, (255, 255, 255),
                            (int(self.observer_x), int(self.observer_y)), 12, 2)
 
+        # Draw extra emitters and moving observers
+        self.draw_extras()
+
         # Draw info
         self.draw_info()
 
-        pygame.display.flip()
-
     def run(self):
         running = True
+        accumulator = 0.0
+        pending_events = []
+        if SIM_WORKER:
+            self.worker = SimWorker(MAX_EMITTERS, MAX_OBSERVERS, SOURCE_HISTORY_STEPS, self.sound_enabled)
 
         while running:
-            dt = self.clock.tick(FPS) / 1000.0  # Delta time in seconds
-            current_time = pygame.time.get_ticks()
+            self.profiler.begin_frame()
+            frame_ms = self.clock.tick(FPS)
+            accumulator += frame_ms / 1000.0  # Real time since last frame
+            self.profiler.mark("idle")
+            self.quality.begin_work()
 
             # Handle events
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.VIDEOEXPOSE:
+                    self.dirty.invalidate()
                 elif event.type == pygame.KEYDOWN:
+                    if self.profiler.handle_key(event.key):
+                        continue
                     if event.key == pygame.K_ESCAPE:
                         running = False
                     elif event.key == pygame.K_s:
                         # Toggle sound
                         self.sound_enabled = not self.sound_enabled
-                        if not self.sound_enabled:
+                        if self.worker is not None:
+                            self.worker.set_sound(self.sound_enabled)
+                        elif not self.sound_enabled:
                             self.sound_generator.stop()
-                    elif event.key == pygame.K_r:
-                        # Reset observer position
-                        self.observer_x = WIDTH - 150
-                        self.observer_y = HEIGHT // 2
                     elif event.key == pygame.K_SPACE:
-                        # Reset simulation
-                        self.waves.clear()
+                        # Reset simulation (the core clears the waves)
                         self.sound_generator.stop()
-
-            # Update simulation
-            self.update_source_position(dt)
-            self.calculate_observed_frequency()
-            self.update_sound(current_time)
-            self.emit_wave(current_time)
-            self.update_waves(current_time)
+                    elif event.key == pygame.K_f:
+                        self.toggle_field()
+                    elif event.key == pygame.K_p and self.history is not None:
+                        self.toggle_pause()
+                        accumulator = 0.0
+                    elif event.key == pygame.K_F5 and self.recorder is not None:
+                        print(f"Input recording written to {self.recorder.save_timestamped()}")
+            pending_events.extend(events)
+            mouse_pos = pygame.mouse.get_pos()
+            mouse_velocity = self.mouse_tracker.feed(events, mouse_pos)
+            if self.recorder is not None:
+                self.recorder.begin_frame(frame_ms)
+            self.profiler.mark("events")
+
+            if self.history is not None and self.history.paused:
+                # Only the arrow keys move the simulation while paused
+                self.history.scrub_keys()
+                pending_events = []
+                accumulator = 0.0
+                self.profiler.mark("physics")
+            elif self.worker is not None:
+                # The worker steps and mixes on its own clock; pass it this
+                # frame's input and draw whatever it last published
+                self.worker.send_input(InputState.from_events(pending_events, mouse_pos, mouse_velocity))
+                pending_events = []
+                self.worker.read_into(self)
+                self.profiler.mark("physics")
+            else:
+                # Update simulation in fixed steps; presses go to the first step
+                steps = 0
+                while accumulator >= FIXED_DT and steps < MAX_STEPS_PER_FRAME:
+                    input_state = InputState.from_events(pending_events, mouse_pos, mouse_velocity)
+                    if self.history is not None:
+                        self.history.step(input_state, FIXED_DT)
+                    else:
+                        self.step(FIXED_DT, input_state)
+                    if self.recorder is not None:
+                        self.recorder.record(input_state, FIXED_DT)
+                    pending_events = []
+                    accumulator -= FIXED_DT
+                    steps += 1
+                if steps == MAX_STEPS_PER_FRAME:
+                    accumulator = 0.0  # Too far behind; drop the backlog
+                self.update_sound(self.sim_time)
+                self.profiler.mark("update_sound")
 
             # Draw everything
-            self.draw(current_time)
+            self.draw(self.sim_time)
+            self.profiler.end_frame()
+            if self.app.first_frame():
+                running = False
+            if self.quality.end_work():
+                self.apply_quality(self.quality.settings)
 
         # Cleanup
+        if self.worker is not None:
+            self.worker.stop()
         self.sound_generator.stop()
+        if self.pressure_field is not None:
+            self.pressure_field.close()
         pygame.quit()
         sys.exit()
 
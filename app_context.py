@@ -0,0 +1,89 @@
+"""Lazily initialised pygame state for one app.
+
+Importing DOPPLE_EFFECT or mainWindow sets nothing up, so both can be used
+as libraries (headless cores, benchmarks, offline renders) without a
+display. An AppContext brings up each piece the first time it is asked
+for, and only the pygame subsystems that piece needs: the window, the
+clock, fonts by size, and the mixer for apps that make sound.
+
+It also times startup: first_frame() records how long the app took from
+creating its context to presenting its first frame. With the environment
+variable DOPPLE_STARTUP_EXIT set, it prints that and asks the app to shut
+down, which is what benchmarks.bench_startup uses.
+
+spawn_context() is the multiprocessing context for the processes the
+apps start (the simulation worker, offline render workers).
+"""
+import multiprocessing
+import os
+import time
+
+import pygame
+
+STARTUP_EXIT_ENV = "DOPPLE_STARTUP_EXIT"
+
+
+class AppContext:
+    """Window, clock, fonts and mixer of one app, each set up on first use"""
+
+    def __init__(self, size, caption, mixer_settings=None):
+        self.size = size
+        self.caption = caption
+        self.mixer_settings = mixer_settings  # pygame.mixer.init() keywords; None = no audio
+        self.created = time.perf_counter()
+        self.startup_ms = None
+        self._screen = None
+        self._clock = None
+        self._fonts = {}
+
+    @property
+    def screen(self):
+        """The window surface, opened on first use"""
+        if self._screen is None:
+            pygame.display.init()
+            self._screen = pygame.display.set_mode(self.size)
+            pygame.display.set_caption(self.caption)
+        return self._screen
+
+    @property
+    def clock(self):
+        if self._clock is None:
+            self._clock = pygame.time.Clock()
+        return self._clock
+
+    def font(self, size):
+        """The default font at size, loaded once"""
+        font = self._fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self._fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def init_mixer(self):
+        """Start the mixer if this app has audio and it is not running yet"""
+        if self.mixer_settings is not None and not pygame.mixer.get_init():
+            pygame.mixer.init(**self.mixer_settings)
+
+    def first_frame(self):
+        """Call after presenting each frame; the first call records
+        startup_ms. Returns True when the app should quit now."""
+        if self.startup_ms is not None:
+            return False
+        self.startup_ms = (time.perf_counter() - self.created) * 1000.0
+        if os.environ.get(STARTUP_EXIT_ENV):
+            print(f"startup_ms={self.startup_ms:.1f}", flush=True)
+            return True
+        return False
+
+
+def spawn_context():
+    """multiprocessing context for child processes of an app.
+
+    Children are spawned, not forked: the parent has initialised SDL,
+    which does not survive fork. They inherit SDL_NO_SIGNAL_HANDLERS, as
+    SDL would otherwise turn SIGTERM into a quit event and terminate()
+    would leave them running.
+    """
+    os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+    return multiprocessing.get_context("spawn")
@@ -0,0 +1,63 @@
+"""Streaming audio output for the Doppler demos.
+
+A producer thread renders small blocks from a source and queues them on a
+dedicated pygame mixer channel, so the render loop only ever hands over a
+new target frequency.
+"""
+import threading
+
+import pygame
+
+STREAM_CHUNK_FRAMES = 512  # One mixer buffer at the default settings
+STREAM_POLL_INTERVAL = 0.002  # seconds between queue checks
+
+
+class AudioStream:
+    """Background producer feeding rendered blocks to one mixer channel"""
+
+    def __init__(self, source, chunk_frames=STREAM_CHUNK_FRAMES, channel_id=0):
+        self.source = source  # Anything with render(frames) -> int16 (frames, 2)
+        self.chunk_frames = chunk_frames
+        self.channel_id = channel_id
+        self.channel = None
+        self.blocks_rendered = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Reserve the channel and start the producer thread"""
+        if self.is_running:
+            return
+        # Keep Sound.play() from grabbing our channel
+        pygame.mixer.set_reserved(self.channel_id + 1)
+        self.channel = pygame.mixer.Channel(self.channel_id)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AudioStream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the producer thread and silence the channel"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.channel is not None:
+            self.channel.stop()
+
+    def _next_sound(self):
+        self.blocks_rendered += 1
+        return pygame.sndarray.make_sound(self.source.render(self.chunk_frames))
+
+    def _run(self):
+        # Render each block only when the queue slot frees up so it picks up
+        # the newest target, keeping latency to about one block
+        while not self._stop_event.is_set():
+            if not self.channel.get_busy():
+                self.channel.play(self._next_sound())
+            if self.channel.get_queue() is None:
+                self.channel.queue(self._next_sound())
+            self._stop_event.wait(STREAM_POLL_INTERVAL)
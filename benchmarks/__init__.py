@@ -0,0 +1,2 @@
+# Benchmarks for the Doppler demos. Run from the repository root, e.g.
+#   python -m benchmarks.bench_tone
@@ -0,0 +1,100 @@
+"""Benchmark: InterferenceEngine vs the pairwise detect_wave_interference.
+
+Builds scenes of live ExpandingCircles at several sizes, checks that both
+implementations find the same interference points and prints how the time
+per pass scales. "arrays" is the engine without building InterferencePoint
+objects. The random scenes are far denser than a held-click trail.
+
+    python -m benchmarks.bench_interference [--scene random|trail] [--sizes 50 100 250 500]
+"""
+import argparse
+import math
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import mainWindow  # noqa: E402
+
+
+def make_circles(count, seed=0):
+    """Circles spawned at random points and grown to random ages"""
+    rng = random.Random(seed)
+    circles = []
+    for k in range(count):
+        circle = mainWindow.ExpandingCircle(rng.randint(0, mainWindow.SCREEN_SIZE[0]),
+                                            rng.randint(0, mainWindow.SCREEN_SIZE[1]),
+                                            k % 2 == 0)
+        for _ in range(rng.randint(1, circle.max_radius // mainWindow.game_params['expansion_rate'] - 1)):
+            circle.update()
+        circles.append(circle)
+    return circles
+
+
+def make_trail(count):
+    """Circles spawned along a moving cursor path, as a held click does"""
+    params = mainWindow.game_params
+    circles = []
+    frame = 0
+    while len(circles) < count:
+        frame += 1
+        circles = [c for c in circles if not c.update()]
+        if frame % params['spawn_rate'] == 0:
+            x = mainWindow.SCREEN_SIZE[0] / 2 + 180 * math.cos(frame / 37)
+            y = mainWindow.SCREEN_SIZE[1] / 2 + 180 * math.sin(frame / 23)
+            circles.append(mainWindow.ExpandingCircle(int(x), int(y), len(circles) % 2 == 0))
+        if frame > 100000:
+            break
+    return circles
+
+
+def best_time_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000.0)
+    return best
+
+
+def point_key(point):
+    return (round(point.x, 6), round(point.y, 6), point.type, round(point.intensity, 9))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 250, 500, 1000])
+    parser.add_argument("--scene", choices=("random", "trail"), default="random")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-legacy", type=int, default=500,
+                        help="skip the pairwise version above this many circles")
+    args = parser.parse_args()
+
+    engine = mainWindow.InterferenceEngine()
+    print(f"{'circles':>8} {'pairwise ms':>12} {'engine ms':>10} {'arrays ms':>10} "
+          f"{'candidates':>11} {'points':>7}")
+    for count in args.sizes:
+        if args.scene == "trail":
+            # Enough spawns per frame to keep `count` circles alive at once
+            mainWindow.game_params.update(spawn_rate=1, expansion_rate=1, max_radius=max(200, count))
+            circles = make_trail(count)
+        else:
+            circles = make_circles(count)
+        engine_ms = best_time_ms(lambda: engine.detect(circles), args.repeat)
+        arrays_ms = best_time_ms(lambda: engine.detect_arrays(circles), args.repeat)
+        points = engine.detect(circles)
+
+        legacy_ms = float("nan")
+        if count <= args.max_legacy:
+            legacy_ms = best_time_ms(lambda: mainWindow.detect_wave_interference(circles), 1)
+            legacy = mainWindow.detect_wave_interference(circles)
+            assert [point_key(p) for p in legacy] == [point_key(p) for p in points], \
+                f"engine and pairwise results differ for {count} circles"
+
+        print(f"{len(circles):8d} {legacy_ms:12.2f} {engine_ms:10.2f} {arrays_ms:10.2f} "
+              f"{engine.candidate_count:11d} {len(points):7d}")
+
+
+if __name__ == "__main__":
+    main()
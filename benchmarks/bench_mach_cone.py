@@ -0,0 +1,103 @@
+"""Micro-benchmark: analytic Mach cone vs a dense ring per step.
+
+Records a straight supersonic pass, then times one frame of each way of
+showing its shock front, everything it takes to get it onto the screen:
+
+    cone    mach_cone.cone_polygons() over the history, its two flanks
+            drawn as lines straight onto the screen, as the demo does
+    rings   a ring emitted every simulation step, the only rate at which
+            rings show the front, each drawn as a circle into the SRCALPHA
+            overlay, which is then composited onto the screen and cleared
+            as draw_waves() does
+
+Each frame also puts the background back over what the previous one drew,
+as the dirty-rect erase does, so a mode drawing into a large bounding box
+pays for restoring it.
+
+    python -m benchmarks.bench_mach_cone [--mach 2.0] [--frames 200]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import DOPPLE_EFFECT  # noqa: E402
+from mach_cone import cone_half_angle, cone_polygons  # noqa: E402
+from pressure_field import SourceHistory  # noqa: E402
+
+
+def record_pass(mach):
+    """A full history of the source crossing the window at mach"""
+    history = SourceHistory(DOPPLE_EFFECT.SOURCE_HISTORY_STEPS)
+    speed = mach * DOPPLE_EFFECT.SOUND_SPEED
+    t = 0.0
+    for step in range(DOPPLE_EFFECT.SOURCE_HISTORY_STEPS):
+        t = step * DOPPLE_EFFECT.FIXED_DT
+        history.push(t, speed * t - speed * DOPPLE_EFFECT.SOURCE_HISTORY_STEPS * DOPPLE_EFFECT.FIXED_DT
+                     + DOPPLE_EFFECT.WIDTH * 0.8, DOPPLE_EFFECT.HEIGHT / 2)
+    return history, t
+
+
+def draw_cone(screen, overlay, history, now):
+    run = DOPPLE_EFFECT.MACH_CONE_DAMAGE_RUN
+    drawn = []
+    for polygon in cone_polygons(*history.window(), now, DOPPLE_EFFECT.SOUND_SPEED):
+        pygame.draw.lines(screen, DOPPLE_EFFECT.MACH_CONE_COLOR, False, polygon.tolist(), 2)
+        for start in range(0, len(polygon) - 1, run):
+            points = polygon[start:start + run + 1]
+            (left, top), (right, bottom) = points.min(axis=0), points.max(axis=0)
+            drawn.append(pygame.Rect(left - 2, top - 2, right - left + 5, bottom - top + 5))
+    return drawn
+
+
+def draw_rings(screen, overlay, history, now):
+    t, x, y = history.window()
+    radius = DOPPLE_EFFECT.SOUND_SPEED * (now - t)
+    alpha = np.maximum(0, 255 - (now - t) * 1000.0 / DOPPLE_EFFECT.WAVE_LIFETIME * 255)
+    overlay_rect = None
+    drawn = []
+    for cx, cy, r, a in zip(x.tolist(), y.tolist(), radius.tolist(), alpha.tolist()):
+        if r > 2 and a > 0:
+            rect = pygame.draw.circle(overlay, (*DOPPLE_EFFECT.WAVE_COLOR, int(a)), (cx, cy), int(r), 2)
+            overlay_rect = rect if overlay_rect is None else overlay_rect.union(rect)
+    if overlay_rect is not None:
+        drawn.append(screen.blit(overlay, overlay_rect.topleft, overlay_rect))
+        overlay.fill((0, 0, 0, 0), overlay_rect)
+    return drawn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mach", type=float, default=2.0)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    size = (DOPPLE_EFFECT.WIDTH, DOPPLE_EFFECT.HEIGHT)
+    screen = pygame.Surface(size)
+    background = pygame.Surface(size)
+    background.fill(DOPPLE_EFFECT.BACKGROUND_COLOR)
+    overlay = pygame.Surface(size, pygame.SRCALPHA)
+    history, now = record_pass(args.mach)
+    budget_ms = 1000.0 / DOPPLE_EFFECT.FPS
+
+    print(f"Mach {args.mach:.2f}, cone half-angle {cone_half_angle(args.mach):.1f} deg, "
+          f"{len(history)} history samples")
+    print(f"{'mode':>6s} {'frame ms':>9s} {'% of frame':>11s}")
+    for name, draw in (("cone", draw_cone), ("rings", draw_rings)):
+        drawn = draw(screen, overlay, history, now)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            screen.blits([(background, rect, rect) for rect in drawn], doreturn=False)
+            drawn = draw(screen, overlay, history, now)
+        frame_ms = (time.perf_counter() - start) / args.frames * 1000.0
+        print(f"{name:>6s} {frame_ms:9.3f} {frame_ms / budget_ms:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Micro-benchmark: pressure-field heatmap frame time.
+
+Records a source circling the window, checks that tiled renders match a
+single-tile render pixel for pixel, then prints the time per field frame
+at several thread counts next to the frame budget.
+
+    python -m benchmarks.bench_pressure [--workers 1 2 4] [--speed 200] [--frames 60]
+"""
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import DOPPLE_EFFECT  # noqa: E402
+from pressure_field import PressureField, SourceHistory, field_palette  # noqa: E402
+
+
+def record_circle(speed):
+    """A full history of the source circling the window centre at speed px/s"""
+    history = SourceHistory(DOPPLE_EFFECT.SOURCE_HISTORY_STEPS)
+    radius = 200
+    t = 0.0
+    for step in range(DOPPLE_EFFECT.SOURCE_HISTORY_STEPS):
+        t = step * DOPPLE_EFFECT.FIXED_DT
+        angle = speed / radius * t
+        history.push(t, DOPPLE_EFFECT.WIDTH / 2 + radius * math.cos(angle),
+                     DOPPLE_EFFECT.HEIGHT / 2 + radius * math.sin(angle))
+    return history, t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--speed", type=float, default=200.0, help="source speed in px/s")
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    size = (DOPPLE_EFFECT.WIDTH, DOPPLE_EFFECT.HEIGHT)
+    surface = pygame.Surface(size)
+    palette = field_palette(DOPPLE_EFFECT.BACKGROUND_COLOR, DOPPLE_EFFECT.WAVE_COLOR, DOPPLE_EFFECT.SOURCE_COLOR)
+    history, t = record_circle(args.speed)
+
+    reference = PressureField(size, DOPPLE_EFFECT.SOUND_SPEED, palette, workers=1)
+    reference.render(surface, t, history)
+    expected = reference.levels.copy()
+
+    budget_ms = 1000.0 / DOPPLE_EFFECT.FPS
+    print(f"grid {reference.grid_size[0]}x{reference.grid_size[1]}, source at {args.speed:.0f} px/s")
+    print(f"{'workers':>8s} {'field ms':>10s} {'% of frame':>11s}")
+    for workers in args.workers:
+        field = PressureField(size, DOPPLE_EFFECT.SOUND_SPEED, palette, workers=workers)
+        field.render(surface, t, history)
+        assert np.array_equal(field.levels, expected), workers
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            field.render(surface, t, history)
+        field_ms = (time.perf_counter() - start) / args.frames * 1000.0
+        field.close()
+        print(f"{workers:8d} {field_ms:10.3f} {field_ms / budget_ms:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Micro-benchmark: DopplerSolver on N sources x M observers.
+
+Checks the vectorized solve against the scalar solve_pair on every pair,
+then prints the time per solve at several scene sizes next to the frame
+budget.
+
+    python -m benchmarks.bench_solver [--sizes 10x10 100x10 1000x100] [--repeat 50]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import DOPPLE_EFFECT  # noqa: E402
+from doppler_solver import DopplerSolver  # noqa: E402
+
+
+def make_scene(sources, observers, seed=0):
+    """Random positions and velocities, some sources faster than sound"""
+    rng = np.random.default_rng(seed)
+    size = (DOPPLE_EFFECT.WIDTH, DOPPLE_EFFECT.HEIGHT)
+    return (rng.uniform(0, size, (sources, 2)),
+            rng.uniform(-400, 400, (sources, 2)),
+            rng.uniform(200, 800, sources),
+            rng.uniform(0, size, (observers, 2)),
+            rng.uniform(-150, 150, (observers, 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["10x10", "100x10", "1000x100"])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    solver = DopplerSolver(DOPPLE_EFFECT.SOUND_SPEED)
+    scene = make_scene(50, 20)
+    frequencies = solver.solve(*scene).copy()
+    source_pos, source_vel, base, observer_pos, observer_vel = scene
+    for n in range(len(source_pos)):
+        for m in range(len(observer_pos)):
+            expected = solver.solve_pair(source_pos[n], source_vel[n], base[n], observer_pos[m], observer_vel[m])
+            assert abs(frequencies[n, m] - expected) < 1e-9, (n, m)
+
+    budget_ms = 1000.0 / DOPPLE_EFFECT.FPS
+    print(f"{'sources x observers':>20s} {'solve ms':>10s} {'% of frame':>11s}")
+    for size in args.sizes:
+        sources, observers = (int(part) for part in size.split("x"))
+        scene = make_scene(sources, observers)
+        solver.solve(*scene)  # Allocate the scratch arrays
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            solver.solve(*scene)
+        solve_ms = (time.perf_counter() - start) / args.repeat * 1000.0
+        print(f"{size:>20s} {solve_ms:10.3f} {solve_ms / budget_ms:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Micro-benchmark: cold start of both apps.
+
+Launches each app in a fresh interpreter with the dummy SDL drivers and
+DOPPLE_STARTUP_EXIT set, so it quits right after presenting its first
+frame, and prints the median of several launches:
+
+    import ms   python -c "import <module>" alone (no pygame set up)
+    first ms    app context created -> first frame, as the app reports it
+    total ms    process launch -> exit, measured from outside
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from app_context import STARTUP_EXIT_ENV
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {"doppler": "DOPPLE_EFFECT", "game": "mainWindow"}
+
+
+def launch(args, extra_env=None):
+    """Wall time in ms and stdout of one fresh interpreter"""
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", **(extra_env or {}))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000.0, result.stdout
+
+
+def first_frame_ms(stdout):
+    for line in stdout.splitlines():
+        if line.startswith("startup_ms="):
+            return float(line.split("=", 1)[1])
+    raise RuntimeError("app exited without reporting its first frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'app':>8s} {'import ms':>10s} {'first ms':>9s} {'total ms':>9s}")
+    for app, module in APPS.items():
+        imports, firsts, totals = [], [], []
+        for _ in range(args.runs):
+            imports.append(launch(["-c", f"import {module}"])[0])
+            total, stdout = launch([module + ".py"], {STARTUP_EXIT_ENV: "1"})
+            totals.append(total)
+            firsts.append(first_frame_ms(stdout))
+        print(f"{app:>8s} {np.median(imports):10.1f} {np.median(firsts):9.1f} {np.median(totals):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
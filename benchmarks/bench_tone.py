@@ -0,0 +1,71 @@
+"""Micro-benchmark: time to build one SoundGenerator tone buffer.
+
+Compares the original per-sample Python loop with the vectorized
+generate_tone and with the cached Sound lookup used by update_sound.
+
+    python -m benchmarks.bench_tone [--duration-ms 200] [--repeat 50]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import DOPPLE_EFFECT  # noqa: E402
+
+
+def legacy_generate_tone(sample_rate, frequency, duration_ms):
+    """The original loop-based generate_tone, kept for comparison"""
+    frames = int(duration_ms * sample_rate / 1000)
+    arr = np.zeros((frames, 2))
+
+    for i in range(frames):
+        sample = np.sin(2 * np.pi * frequency * i / sample_rate) * 0.3
+        arr[i] = [sample, sample]
+
+    return (arr * 32767).astype(np.int16)
+
+
+def time_call(func, repeat):
+    """Return the median wall time of func() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration-ms", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    pygame.mixer.init(**DOPPLE_EFFECT.MIXER_SETTINGS)  # Sounds need the mixer
+    generator = DOPPLE_EFFECT.SoundGenerator()
+    freq = 523.25
+    duration = args.duration_ms
+
+    legacy = legacy_generate_tone(generator.sample_rate, freq, duration)
+    assert np.array_equal(legacy, generator.generate_tone(freq, duration))
+
+    legacy_ms = time_call(lambda: legacy_generate_tone(generator.sample_rate, freq, duration),
+                          max(1, args.repeat // 10))
+    vector_ms = time_call(lambda: generator.generate_tone(freq, duration), args.repeat)
+    generator.get_tone_sound(freq, duration)  # Warm the cache
+    cached_ms = time_call(lambda: generator.get_tone_sound(freq, duration), args.repeat)
+
+    print(f"One {duration} ms buffer at {freq} Hz:")
+    print(f"  before (Python loop):   {legacy_ms:9.3f} ms")
+    print(f"  after  (vectorized):    {vector_ms:9.3f} ms  ({legacy_ms / vector_ms:.0f}x)")
+    print(f"  after  (cached Sound):  {cached_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
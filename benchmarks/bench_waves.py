@@ -0,0 +1,85 @@
+"""Benchmark: wave ring drawing with per-wave surfaces vs the sprite cache.
+
+Keeps a dense set of live waves (WAVE_FREQUENCY raised so 20+ are alive)
+and times drawing them each frame, reporting frame time and the largest
+resident set size seen while drawing. Each mode runs in its own process so
+the RSS figures do not mix.
+
+    python -m benchmarks.bench_waves [--frames 300] [--waves-per-second 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import DOPPLE_EFFECT  # noqa: E402
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), or 0 if unknown"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def run(sim, frames, draw):
+    frame_ms = []
+    peak_rss = current_rss_mb()
+    current_time = 0
+    for frame in range(frames):
+        current_time += 1000 // DOPPLE_EFFECT.FPS
+        sim.source_x = DOPPLE_EFFECT.WIDTH / 2 + 300 * np.sin(frame / 40)
+        sim.emit_wave(current_time)
+        sim.update_waves(current_time)
+
+        start = time.perf_counter()
+        sim.screen.fill(DOPPLE_EFFECT.BACKGROUND_COLOR)
+        draw(current_time)
+        frame_ms.append((time.perf_counter() - start) * 1000.0)
+        peak_rss = max(peak_rss, current_rss_mb())
+    return frame_ms, peak_rss
+
+
+MODES = ("legacy", "cached")
+LABELS = {"legacy": "per-wave surfaces", "cached": "ring sprite cache"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--waves-per-second", type=float, default=10)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode is None:
+        for mode in MODES:
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_waves", "--mode", mode,
+                            "--frames", str(args.frames),
+                            "--waves-per-second", str(args.waves_per_second)], check=True)
+        return
+
+    sim = DOPPLE_EFFECT.DopplerSimulation()
+    sim.wave_interval = 1000 / args.waves_per_second
+
+    def legacy_draw(current_time):
+        for wave in sim.waves:
+            wave.draw(sim.screen, current_time)
+
+    draw = legacy_draw if args.mode == "legacy" else (lambda current_time: sim.draw_waves())
+    ms, rss = run(sim, args.frames, draw)
+
+    print(f"{LABELS[args.mode]:18s} {len(sim.waves)} live waves  mean {np.mean(ms):7.3f} ms"
+          f"  p95 {np.percentile(ms, 95):7.3f} ms  peak RSS {rss:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Reproducible benchmark suite for DOPPLE_EFFECT.py and mainWindow.py.
+
+Drives both simulation cores with scripted cursor paths at several
+settings and records per-frame update, draw and audio time (p50/p95/p99),
+Python allocations per frame, peak memory and generate_tone throughput.
+Each scenario also records the quality tier the governor would pick from
+its frame times; with --adaptive it switches tiers as the live apps do.
+
+    python -m benchmarks.suite                       # run, compare with baseline
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --update-baseline     # accept current numbers
+    python -m benchmarks.suite --only game-dense-held
+    python -m benchmarks.suite --adaptive --output adaptive.json
+
+Exits with status 1 when a metric is worse than the stored baseline by
+more than --threshold (default 25%).
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import DOPPLE_EFFECT  # noqa: E402
+import mainWindow  # noqa: E402
+from mixing_bus import MixingBus, voice_gains  # noqa: E402
+from quality import QualityGovernor  # noqa: E402
+from sim_input import circle_path, straight_pass, sweep_path  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SCHEMA_VERSION = 1
+ALLOC_FRAMES = 120  # Frames traced with tracemalloc (tracing is slow)
+MIN_TIMING_MS = 0.05  # Timings below this are too noisy to gate on
+
+
+def doppler_paths(frames):
+    w, h = DOPPLE_EFFECT.WIDTH, DOPPLE_EFFECT.HEIGHT
+    return {
+        "sweep": lambda: sweep_path(frames, h // 2, 100, w - 250, 240),
+        "circle": lambda: circle_path(frames, (w // 2, h // 2), 200, 300),
+        "supersonic": lambda: straight_pass(frames, h // 3, 0, w, 8),
+    }
+
+
+def game_paths(frames):
+    w, h = mainWindow.SCREEN_SIZE
+    return {
+        "sweep": lambda: sweep_path(frames, h // 2, 50, w - 50, 120, hold_button=1),
+        "circle": lambda: circle_path(frames, (w // 2, h // 2), 150, 90, hold_button=1),
+        "held": lambda: circle_path(frames, (w // 2, h // 2), 20, 400, hold_button=1),
+    }
+
+
+# Scenario name -> (app, path, settings)
+SCENARIOS = {
+    "doppler-sweep": ("doppler", "sweep", {}),
+    "doppler-circle": ("doppler", "circle", {}),
+    "doppler-supersonic": ("doppler", "supersonic", {}),
+    "doppler-dense-sweep": ("doppler", "sweep", {"wave_interval": 100}),
+    "doppler-crowd": ("doppler", "circle", {"crowd": (1000, 100)}),
+    "game-default-sweep": ("game", "sweep", {}),
+    "game-default-circle": ("game", "circle", {}),
+    "game-dense-held": ("game", "held", {"spawn_rate": 5, "max_radius": 500}),
+    "game-fast-circle": ("game", "circle", {"frame_rate": 60, "expansion_rate": 10}),
+}
+
+DEFAULT_GAME_PARAMS = dict(mainWindow.game_params)
+
+
+def percentiles(samples):
+    samples = np.asarray(samples)
+    return {
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+        "mean": float(samples.mean()),
+    }
+
+
+class DopplerHarness:
+    def __init__(self, settings, adaptive=False):
+        self.sim = DOPPLE_EFFECT.DopplerSimulation()
+        self.quality = self.sim.quality
+        self.quality.adaptive = adaptive
+        settings = dict(settings)
+        emitters, observers = settings.pop("crowd", (0, 0))
+        for name, value in settings.items():
+            setattr(self.sim, name, value)
+
+        # Half orbiting emitters, half sirens, plus a row of moving observers
+        w, h = DOPPLE_EFFECT.WIDTH, DOPPLE_EFFECT.HEIGHT
+        for k in range(emitters):
+            x, y = (k * 37) % w, (k * 53) % h
+            if k % 2:
+                self.sim.add_emitter(x, y)
+            else:
+                self.sim.add_siren(x, y)
+        for k in range(observers):
+            self.sim.add_observer((k * 97) % w, (k * 31) % h)
+        self.dt = DOPPLE_EFFECT.FIXED_DT
+        self.bus = MixingBus(self.sim.sound_generator.sample_rate)
+        self.audio_frames = int(round(self.sim.sound_generator.sample_rate * self.dt))
+
+    def update(self, input_state):
+        self.sim.step(self.dt, input_state)
+
+    def apply_quality(self):
+        self.sim.apply_quality(self.quality.settings)
+
+    def draw(self):
+        self.sim.draw(self.sim.sim_time)
+
+    def audio(self):
+        # The audio the streamed mix needs for one step of simulation
+        frequencies, offsets_x, distances = self.sim.voice_geometry()
+        self.bus.set_voices(frequencies, voice_gains(offsets_x, distances))
+        self.bus.render(self.audio_frames)
+
+    def summary(self):
+        return {"waves": len(self.sim.waves), "observed_hz": round(self.sim.observed_frequency, 3),
+                "pairs": int(self.sim.frequencies.size)}
+
+
+class GameHarness:
+    def __init__(self, settings, adaptive=False):
+        mainWindow.game_params.clear()
+        mainWindow.game_params.update(DEFAULT_GAME_PARAMS, **settings)
+        self.core = mainWindow.GameCore()
+        self.quality = QualityGovernor(mainWindow.QUALITY_TIERS,
+                                       mainWindow.RENDER_FPS or mainWindow.game_params['frame_rate'],
+                                       adaptive=adaptive)
+        self.surface = pygame.Surface(mainWindow.SCREEN_SIZE)
+        self.dt = self.core.fixed_dt
+
+    def update(self, input_state):
+        self.core.step(self.dt, input_state)
+
+    def apply_quality(self):
+        self.core.apply_quality(self.quality.settings)
+
+    def draw(self):
+        mainWindow.draw_game(self.surface, self.core)
+
+    def audio(self):
+        pass  # The game has no audio
+
+    def summary(self):
+        return {"circles": len(self.core.circles), "spawned": self.core.circle_count,
+                "interference_points": len(self.core.interference_points)}
+
+
+def make_harness(app, settings, adaptive=False):
+    return DopplerHarness(settings, adaptive) if app == "doppler" else GameHarness(settings, adaptive)
+
+
+def run_scenario(name, frames, adaptive=False):
+    app, path, settings = SCENARIOS[name]
+    paths = doppler_paths(frames) if app == "doppler" else game_paths(frames)
+
+    # Timed pass; the governor sees every frame's time
+    harness = make_harness(app, settings, adaptive)
+    timings = {"update": [], "draw": [], "audio": [], "frame": []}
+    clock = time.perf_counter
+    for input_state in paths[path]():
+        t0 = clock()
+        harness.update(input_state)
+        t1 = clock()
+        harness.draw()
+        t2 = clock()
+        harness.audio()
+        t3 = clock()
+        timings["update"].append((t1 - t0) * 1000.0)
+        timings["draw"].append((t2 - t1) * 1000.0)
+        timings["audio"].append((t3 - t2) * 1000.0)
+        timings["frame"].append((t3 - t0) * 1000.0)
+        if harness.quality.update((t3 - t0) * 1000.0):
+            harness.apply_quality()
+    summary = harness.summary()
+    quality = harness.quality.summary()
+
+    # Allocation pass on a fresh harness: bytes allocated per frame and heap peak
+    harness = make_harness(app, settings)
+    per_frame = []
+    tracemalloc.start()
+    for input_state in paths[path]():
+        if len(per_frame) == min(frames, ALLOC_FRAMES):
+            break
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        harness.update(input_state)
+        harness.draw()
+        harness.audio()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        per_frame.append(peak_bytes - start_bytes)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {name + "_ms": percentiles(samples) for name, samples in timings.items()}
+    result["alloc_kb_per_frame"] = float(np.mean(per_frame) / 1024.0)
+    result["python_heap_peak_mb"] = heap_peak / (1024.0 * 1024.0)
+    result["final_state"] = summary
+    result["quality"] = quality
+    return result
+
+
+def tone_throughput(seconds=1.0):
+    """generate_tone buffers per second (200 ms buffers, varying pitch)"""
+    generator = DOPPLE_EFFECT.SoundGenerator(cache_size=0)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        generator.generate_tone(300 + (count % 400), 200)
+        count += 1
+    elapsed = time.perf_counter() - start
+    return {"buffers_per_s": count / elapsed,
+            "realtime_factor": count * 0.2 / elapsed}
+
+
+def compare(results, baseline, threshold):
+    """List of human-readable regressions beyond the threshold"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for metric in ("update_ms", "draw_ms", "audio_ms", "frame_ms"):
+            for stat in ("p50", "p95"):
+                old, new = base[metric][stat], current[metric][stat]
+                if old >= MIN_TIMING_MS and new > old * (1 + threshold):
+                    regressions.append(f"{name} {metric} {stat}: {old:.3f} -> {new:.3f} ms")
+        old, new = base["alloc_kb_per_frame"], current["alloc_kb_per_frame"]
+        if old > 1.0 and new > old * (1 + threshold):
+            regressions.append(f"{name} alloc_kb_per_frame: {old:.1f} -> {new:.1f}")
+
+    old = baseline.get("tone", {}).get("buffers_per_s")
+    new = results["tone"]["buffers_per_s"]
+    if old and new < old / (1 + threshold):
+        regressions.append(f"generate_tone buffers_per_s: {old:.0f} -> {new:.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="let the quality governor lower detail during the timed pass")
+    args = parser.parse_args()
+
+    names = args.only or list(SCENARIOS)
+    results = {
+        "schema": SCHEMA_VERSION,
+        "frames": args.frames,
+        "adaptive": args.adaptive,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "pygame": pygame.version.ver, "numpy": np.__version__},
+        "scenarios": {},
+    }
+    for name in names:
+        results["scenarios"][name] = run_scenario(name, args.frames, args.adaptive)
+        frame = results["scenarios"][name]["frame_ms"]
+        quality = results["scenarios"][name]["quality"]
+        tier = quality["tier"] if args.adaptive else quality["wanted_tier"]
+        print(f"{name:22s} frame p50 {frame['p50']:7.3f} ms  p95 {frame['p95']:7.3f} ms  "
+              f"p99 {frame['p99']:7.3f} ms  alloc {results['scenarios'][name]['alloc_kb_per_frame']:8.1f} KB/frame  "
+              f"quality {tier}")
+    results["tone"] = tone_throughput()
+    # ru_maxrss is in KB on Linux
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print(f"generate_tone: {results['tone']['buffers_per_s']:.0f} buffers/s "
+          f"({results['tone']['realtime_factor']:.0f}x real time), peak RSS {results['peak_rss_mb']:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --update-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Dirty-rectangle display updates.
+
+Instead of clearing the whole window and flipping every frame, a frame
+restores only the areas drawn on the previous frame from a cached
+background, records the rects of what it draws now, and hands just those
+areas to pygame.display.update(). When the changed area covers most of the
+window a plain flip is cheaper, so present() falls back to one.
+"""
+import pygame
+
+DIRTY_FULL_UPDATE_FRACTION = 0.5  # of the window area; above this, flip
+DIRTY_MAX_RECTS = 64  # more rects than this and a flip is cheaper too
+
+
+class DirtyRects:
+    """Per-frame damage tracking over a static background surface"""
+
+    def __init__(self, surface, background, enabled=True,
+                 full_update_fraction=DIRTY_FULL_UPDATE_FRACTION, max_rects=DIRTY_MAX_RECTS):
+        self.surface = surface
+        self.background = background
+        self.enabled = enabled
+        self.bounds = surface.get_rect()
+        self.full_update_area = full_update_fraction * self.bounds.width * self.bounds.height
+        self.max_rects = max_rects
+
+        self.drawn = []  # drawn this frame; erased at the start of the next
+        self.previous = []  # drawn last frame
+        self.damaged = []  # presented this frame but not erased next frame
+        self.force_full = True  # nothing has been presented yet
+        self.full_updates = 0
+        self.partial_updates = 0
+
+    @property
+    def full_redraw(self):
+        """True when erase() will repaint the whole background"""
+        return not self.enabled or self.force_full
+
+    def erase(self):
+        """Start a frame: put the background back wherever the last frame drew"""
+        if self.full_redraw:
+            self.surface.blit(self.background, (0, 0))
+            return
+        self.surface.blits([(self.background, rect, rect) for rect in self.previous], doreturn=False)
+
+    def restore(self, rect):
+        """Copy the background into rect and present that area this frame"""
+        rect = rect.clip(self.bounds)
+        self.surface.blit(self.background, rect, rect)
+        self.damaged.append(rect)
+
+    def damage(self, rect):
+        """Present rect this frame without erasing it next frame, for
+        drawing that stays put until its owner restores it"""
+        self.damaged.append(rect)
+
+    def add(self, rect):
+        """Record something drawn this frame (None is ignored)"""
+        if rect:
+            self.drawn.append(rect)
+
+    def add_all(self, rects):
+        self.drawn.extend(rect for rect in rects if rect)
+
+    def invalidate(self):
+        """Redraw and present the whole window next frame (e.g. after an expose)"""
+        self.force_full = True
+
+    def present(self):
+        """Push this frame's changes to the display"""
+        rects = [rect.clip(self.bounds) for rect in self.previous + self.drawn + self.damaged]
+        area = sum(rect.width * rect.height for rect in rects)
+        if self.full_redraw or len(rects) > self.max_rects or area > self.full_update_area:
+            pygame.display.flip()
+            self.full_updates += 1
+        else:
+            pygame.display.update(rects)
+            self.partial_updates += 1
+
+        self.previous = self.drawn
+        self.drawn = []
+        self.damaged = []
+        self.force_full = False
@@ -0,0 +1,111 @@
+"""Doppler shift for every source/observer pair in one NumPy pass.
+
+For a source s with velocity v_s and an observer o with velocity v_o, with
+u the unit vector from s to o and c the speed of sound:
+
+    f' = f * (c - v_o . u) / (c - v_s . u)
+
+This is the general moving-source, moving-observer formula; with a still
+observer it is the source-only formula the demo used before. Results are
+clamped the same way: a denominator within 0.1 of zero gives ten times
+the base frequency, everything is clipped to [min, max], and a source
+sitting exactly on an observer is heard at its base frequency.
+"""
+import math
+
+import numpy as np
+
+
+class DopplerSolver:
+    """Observed frequencies for N sources x M observers.
+
+    Scratch arrays are kept between calls and only reallocated when the
+    scene size changes, so a steady scene solves without allocating.
+    """
+
+    def __init__(self, sound_speed, min_frequency=100, max_frequency=1000, stall_factor=10):
+        self.sound_speed = sound_speed
+        self.min_frequency = min_frequency
+        self.max_frequency = max_frequency
+        self.stall_factor = stall_factor  # Multiplier used when the denominator stalls
+        self.shape = None
+
+    def _ensure(self, shape):
+        if shape == self.shape:
+            return
+        self.shape = shape
+        self.dx = np.empty(shape)
+        self.dy = np.empty(shape)
+        self.distance = np.empty(shape)
+        self.numerator = np.empty(shape)
+        self.denominator = np.empty(shape)
+        self.frequency = np.empty(shape)
+        self.scratch = np.empty(shape)
+        self.coincident = np.empty(shape, dtype=bool)
+        self.stalled = np.empty(shape, dtype=bool)
+
+    def solve_pair(self, source_pos, source_vel, base_frequency, observer_pos, observer_vel=(0.0, 0.0)):
+        """Scalar version of solve() for a single pair, without NumPy overhead"""
+        dx = observer_pos[0] - source_pos[0]
+        dy = observer_pos[1] - source_pos[1]
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance == 0:
+            return base_frequency
+        ux = dx / distance
+        uy = dy / distance
+        numerator = self.sound_speed - (observer_vel[0] * ux + observer_vel[1] * uy)
+        denominator = self.sound_speed - (source_vel[0] * ux + source_vel[1] * uy)
+        if abs(denominator) > 0.1:
+            frequency = base_frequency * numerator / denominator
+        else:
+            frequency = base_frequency * self.stall_factor
+        return max(self.min_frequency, min(self.max_frequency, frequency))
+
+    def solve(self, source_pos, source_vel, base_frequency, observer_pos, observer_vel):
+        """(N, M) observed frequencies.
+
+        source_pos, source_vel: (N, 2); base_frequency: (N,);
+        observer_pos, observer_vel: (M, 2). The result, along with distance,
+        dx and dy, is a view of internal scratch space that the next call
+        overwrites.
+        """
+        source_pos = np.asarray(source_pos, dtype=float)
+        source_vel = np.asarray(source_vel, dtype=float)
+        observer_pos = np.asarray(observer_pos, dtype=float)
+        observer_vel = np.asarray(observer_vel, dtype=float)
+        base = np.asarray(base_frequency, dtype=float)[:, np.newaxis]
+        self._ensure((len(source_pos), len(observer_pos)))
+        dx, dy, distance, scratch = self.dx, self.dy, self.distance, self.scratch
+
+        np.subtract(observer_pos[np.newaxis, :, 0], source_pos[:, 0, np.newaxis], out=dx)
+        np.subtract(observer_pos[np.newaxis, :, 1], source_pos[:, 1, np.newaxis], out=dy)
+        np.multiply(dx, dx, out=distance)
+        np.multiply(dy, dy, out=scratch)
+        distance += scratch
+        np.sqrt(distance, out=distance)
+        np.equal(distance, 0, out=self.coincident)
+
+        # Unit vector components, with coincident pairs pointing nowhere
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ux = np.divide(dx, distance, out=self.numerator)
+            uy = np.divide(dy, distance, out=self.denominator)
+        np.copyto(ux, 0.0, where=self.coincident)
+        np.copyto(uy, 0.0, where=self.coincident)
+
+        # Velocity components along source -> observer
+        source_speed = np.multiply(source_vel[:, 0, np.newaxis], ux, out=self.frequency)
+        source_speed += np.multiply(source_vel[:, 1, np.newaxis], uy, out=scratch)
+        observer_speed = np.multiply(observer_vel[np.newaxis, :, 0], ux, out=ux)
+        observer_speed += np.multiply(observer_vel[np.newaxis, :, 1], uy, out=scratch)
+
+        numerator = np.subtract(self.sound_speed, observer_speed, out=self.numerator)
+        denominator = np.subtract(self.sound_speed, source_speed, out=self.denominator)
+        np.less_equal(np.abs(denominator, out=scratch), 0.1, out=self.stalled)
+        np.copyto(denominator, 1.0, where=self.stalled)
+
+        frequency = np.multiply(base, numerator, out=self.frequency)
+        frequency /= denominator
+        np.copyto(frequency, base * self.stall_factor, where=self.stalled)
+        np.clip(frequency, self.min_frequency, self.max_frequency, out=frequency)
+        np.copyto(frequency, base, where=self.coincident)
+        return frequency
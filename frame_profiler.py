@@ -0,0 +1,168 @@
+"""Per-phase frame timing for the main loops.
+
+The loop calls begin_frame(), then mark(phase) as each phase finishes, then
+end_frame(). A mark is one perf_counter() call and a list update, so leaving
+the profiler recording costs next to nothing; the overlay and statistics are
+only computed while the overlay is shown.
+
+    F3  toggle the overlay (rolling mean, p95 and a frame-time graph)
+    F4  save the ring buffer as a Chrome trace / Perfetto JSON file
+"""
+import json
+import time
+
+import numpy as np
+import pygame
+
+PROFILER_CAPACITY = 600  # frames kept in the ring buffer
+OVERLAY_REFRESH = 15  # frames between overlay statistics updates
+OVERLAY_GRAPH_FRAMES = 180
+OVERLAY_BG = (0, 0, 0, 170)
+OVERLAY_TEXT = (230, 230, 230)
+OVERLAY_GRAPH = (120, 220, 120)
+OVERLAY_BUDGET = (220, 90, 90)
+
+
+class FrameProfiler:
+    """Fixed-size ring buffer of per-phase durations, one row per frame"""
+
+    def __init__(self, phases, target_fps, capacity=PROFILER_CAPACITY):
+        self.phases = list(phases)
+        self.phase_index = {name: i for i, name in enumerate(self.phases)}
+        self.target_fps = target_fps
+        self.capacity = capacity
+        self.enabled = True
+        self.overlay_visible = False
+
+        # Ring buffer: phase durations and first start offset (ms), frame totals
+        self.durations = np.zeros((capacity, len(self.phases)))
+        self.starts = np.full((capacity, len(self.phases)), -1.0)
+        self.frame_starts = np.zeros(capacity)
+        self.frame_totals = np.zeros(capacity)
+        self.cursor = 0
+        self.count = 0
+
+        self._epoch = time.perf_counter()
+        self._frame_t0 = 0.0
+        self._last = 0.0
+        self._row_durations = [0.0] * len(self.phases)
+        self._row_starts = [-1.0] * len(self.phases)
+        self._overlay_lines = []
+        self._frames_since_refresh = OVERLAY_REFRESH
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._frame_t0 = self._last = time.perf_counter()
+        self._row_durations = [0.0] * len(self.phases)
+        self._row_starts = [-1.0] * len(self.phases)
+
+    def mark(self, phase):
+        """Attribute the time since the previous mark to phase"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        i = self.phase_index[phase]
+        self._row_durations[i] += (now - self._last) * 1000.0
+        if self._row_starts[i] < 0:
+            self._row_starts[i] = (self._last - self._frame_t0) * 1000.0
+        self._last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        row = self.cursor
+        self.durations[row] = self._row_durations
+        self.starts[row] = self._row_starts
+        self.frame_starts[row] = (self._frame_t0 - self._epoch) * 1000.0
+        self.frame_totals[row] = (time.perf_counter() - self._frame_t0) * 1000.0
+        self.cursor = (row + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def recent_rows(self, frames=None):
+        """Ring indices of the last frames, oldest first"""
+        frames = self.count if frames is None else min(frames, self.count)
+        return (self.cursor - frames + np.arange(frames)) % self.capacity
+
+    def stats(self):
+        """{phase: (mean_ms, p95_ms)} over the buffer, plus 'frame'"""
+        if not self.count:
+            return {}
+        rows = self.recent_rows()
+        result = {}
+        for i, name in enumerate(self.phases):
+            column = self.durations[rows, i]
+            result[name] = (float(column.mean()), float(np.percentile(column, 95)))
+        totals = self.frame_totals[rows]
+        result["frame"] = (float(totals.mean()), float(np.percentile(totals, 95)))
+        return result
+
+    def handle_key(self, key):
+        """Profiler hotkeys; returns True if the key was used"""
+        if key == pygame.K_F3:
+            self.overlay_visible = not self.overlay_visible
+            self._frames_since_refresh = OVERLAY_REFRESH
+            return True
+        if key == pygame.K_F4:
+            path = time.strftime("dopple_trace_%Y%m%d_%H%M%S.json")
+            self.export_chrome_trace(path)
+            print(f"Frame trace written to {path}")
+            return True
+        return False
+
+    def draw_overlay(self, surface, font, topright):
+        """Draw the overlay if visible; returns the rect drawn or None"""
+        if not self.overlay_visible or not self.count:
+            return None
+
+        # Refresh the text a few times per second instead of every frame
+        self._frames_since_refresh += 1
+        if self._frames_since_refresh >= OVERLAY_REFRESH:
+            self._frames_since_refresh = 0
+            lines = [f"{'phase':14s}{'avg':>7s}{'p95':>8s}  ms"]
+            for name, (mean, p95) in self.stats().items():
+                lines.append(f"{name:14s}{mean:7.2f}{p95:8.2f}")
+            self._overlay_lines = [font.render(line, True, OVERLAY_TEXT) for line in lines]
+
+        line_height = font.get_linesize()
+        graph_height = 60
+        width = max(OVERLAY_GRAPH_FRAMES, max(line.get_width() for line in self._overlay_lines)) + 10
+        height = line_height * len(self._overlay_lines) + graph_height + 15
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(OVERLAY_BG)
+        for k, line in enumerate(self._overlay_lines):
+            panel.blit(line, (5, 5 + k * line_height))
+
+        # Frame-time graph, scaled so the frame budget sits at half height
+        budget = 1000.0 / self.target_fps
+        top = height - graph_height - 5
+        scale = graph_height / (2 * budget)
+        budget_y = top + graph_height - budget * scale
+        pygame.draw.line(panel, OVERLAY_BUDGET, (5, budget_y), (width - 5, budget_y), 1)
+        totals = self.frame_totals[self.recent_rows(OVERLAY_GRAPH_FRAMES)]
+        if len(totals) > 1:
+            ys = top + graph_height - np.minimum(totals, 2 * budget) * scale
+            points = list(zip(range(5, 5 + len(ys)), ys.tolist()))
+            pygame.draw.lines(panel, OVERLAY_GRAPH, False, points, 1)
+        return surface.blit(panel, (topright[0] - width, topright[1]))
+
+    def export_chrome_trace(self, path):
+        """Write the buffer as Chrome trace events (chrome://tracing, Perfetto).
+
+        A phase marked several times in one frame appears once, at its first
+        start, with the summed duration.
+        """
+        events = []
+        for row in self.recent_rows():
+            frame_start = self.frame_starts[row]
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": frame_start * 1000.0, "dur": self.frame_totals[row] * 1000.0})
+            for i, name in enumerate(self.phases):
+                start = self.starts[row, i]
+                if start < 0:
+                    continue
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (frame_start + start) * 1000.0,
+                               "dur": self.durations[row, i] * 1000.0})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,103 @@
+"""Run either simulation core with scripted input and no window.
+
+    python headless.py doppler --steps 10000
+    python headless.py game --steps 10000
+    python headless.py game --replay dopple_input_20240101_120000.npz
+
+Uses the SDL dummy video and audio drivers, steps the core at its fixed
+timestep as fast as possible and prints the step rate plus a short state
+summary (identical runs print identical summaries). With --replay the
+steps are those of an input recording saved with F5 in either app.
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from recording import Recording, replay  # noqa: E402
+from sim_input import InputState, circle_path, run_headless  # noqa: E402
+
+
+def doppler_run(steps):
+    import DOPPLE_EFFECT
+
+    core = DOPPLE_EFFECT.DopplerCore()
+    inputs = circle_path(steps, (DOPPLE_EFFECT.WIDTH // 2, DOPPLE_EFFECT.HEIGHT // 2), 250, 480)
+    start = time.perf_counter()
+    run_headless(core, inputs, DOPPLE_EFFECT.FIXED_DT)
+    elapsed = time.perf_counter() - start
+    return elapsed, doppler_summary(core)
+
+
+def doppler_summary(core):
+    return (f"t={core.sim_time:.0f}ms waves={len(core.waves)} "
+            f"observed={core.observed_frequency:.3f}Hz")
+
+
+def game_run(steps):
+    import mainWindow
+
+    core = mainWindow.GameCore()
+
+    def inputs():
+        # Held left click along a circle, dropping a detector every 500 steps
+        for step, state in enumerate(circle_path(steps, (250, 250), 150, 120, hold_button=1)):
+            if step % 500 == 250:
+                state = InputState(state.mouse_pos, state.buttons_down + (3,))
+            yield state
+
+    start = time.perf_counter()
+    run_headless(core, inputs(), core.fixed_dt)
+    elapsed = time.perf_counter() - start
+    return elapsed, game_summary(core)
+
+
+def game_summary(core):
+    hits = sum(len(detector.collision_history) for detector in core.collision_detectors)
+    return (f"frames={core.frame_count} circles={len(core.circles)} "
+            f"spawned={core.circle_count} detector_hits_last_second={hits} "
+            f"interference={len(core.interference_points)}")
+
+
+def replay_run(recording):
+    """Replay a recording into a fresh core of its app"""
+    if recording.app == "doppler":
+        import DOPPLE_EFFECT
+        core = DOPPLE_EFFECT.DopplerCore()
+        tiers, summarize = None, doppler_summary
+    else:
+        import mainWindow
+        mainWindow.game_params.update(recording.meta["game_params"])
+        core = mainWindow.GameCore()
+        tiers, summarize = mainWindow.QUALITY_TIERS, game_summary
+    start = time.perf_counter()
+    replay(recording, core, tiers)
+    elapsed = time.perf_counter() - start
+    return elapsed, summarize(core)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("app", choices=("doppler", "game"))
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--replay", help="input recording (.npz) to replay instead of the script")
+    args = parser.parse_args()
+
+    if args.replay:
+        recording = Recording(args.replay)
+        if recording.app != args.app:
+            parser.error(f"{args.replay} is a {recording.app} recording")
+        steps = len(recording)
+        elapsed, summary = replay_run(recording)
+    else:
+        steps = args.steps
+        run = doppler_run if args.app == "doppler" else game_run
+        elapsed, summary = run(steps)
+    print(f"{steps} steps in {elapsed:.2f} s ({steps / elapsed:.0f} steps/s)")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Pause, rewind and resume for the app cores.
+
+A StateHistory steps a core on the app's behalf and remembers enough to
+put it back at any tick it has passed through:
+
+    keyframes  the core's whole simulation state (the attributes named in
+               its HISTORY_FIELDS), pickled every so often
+    ticks      every step's input, dt and quality tier since the oldest
+               keyframe, one row each in a NumPy array; presses, which
+               are rare, go into a dict by tick
+
+The cores are deterministic given their input (see recording.py), so the
+state at any kept tick is the nearest keyframe at or before it with the
+ticks in between stepped again. A keyframe is taken once KEYFRAME_BUDGET_MS
+of step time or KEYFRAME_INTERVAL ticks have passed since the previous
+one, so a seek restores one keyframe and replays at most that much work,
+well inside a frame.
+
+Memory stays bounded however long the session runs: keyframes older than
+HISTORY_SECONDS go, with the ticks before them, and so do the oldest
+keyframes while the keyframes together exceed HISTORY_BYTES.
+
+Resuming from a past tick forgets everything after it, and the session
+carries on from there.
+"""
+import pickle
+import time
+from bisect import bisect_right
+
+import numpy as np
+import pygame
+
+from sim_input import InputState
+
+KEYFRAME_INTERVAL = 60  # ticks; the most a seek ever replays
+KEYFRAME_BUDGET_MS = 4.0  # step time between keyframes, which bounds a seek on heavy scenes
+HISTORY_SECONDS = 600  # how far back the history reaches at most
+HISTORY_BYTES = 64 * 1024 * 1024  # cap on the keyframes together
+HISTORY_CAPACITY = 4096  # initial tick rows; doubles when full
+SCRUB_TICKS = 2  # ticks moved per frame while LEFT or RIGHT is held (double speed)
+SCRUB_FAST_TICKS = 20  # the same with SHIFT held
+
+TICK_DTYPE = np.dtype([("dt", "f8"), ("mouse", "i4", 2), ("velocity", "f8", 2), ("quality", "u1")])
+
+
+class StateHistory:
+    """Keyframes and per-tick input of one core, for seeking back.
+
+    Ticks are counted from the core's first step: tick n is the state
+    after n steps. end is the live tick and cursor the tick the core is
+    showing, which differ only while paused.
+    """
+
+    def __init__(self, core, fps, quality_tiers=None, max_bytes=HISTORY_BYTES,
+                 capacity=HISTORY_CAPACITY):
+        self.core = core
+        self.fields = core.HISTORY_FIELDS
+        self.fps = fps
+        self.quality_tiers = quality_tiers  # For cores whose step depends on the tier (the game)
+        self.max_ticks = int(HISTORY_SECONDS * fps)
+        self.max_bytes = max_bytes
+
+        self.rows = np.zeros(capacity, dtype=TICK_DTYPE)
+        self.start = 0  # tick of rows[0]
+        self.presses = {}  # tick -> (buttons_down, buttons_up, keys_down)
+        self.keyframe_ticks = []
+        self.keyframes = []  # pickled states, parallel to keyframe_ticks
+        self.keyframe_bytes = 0
+        self.since_keyframe_ms = 0.0
+        self.since_keyframe_ticks = 0
+
+        self.end = 0
+        self.cursor = 0
+        self.paused = False
+        self.tier = None  # quality tier the core was last stepped at
+
+    @property
+    def first(self):
+        """Oldest tick that can still be reached"""
+        return self.keyframe_ticks[0] if self.keyframe_ticks else self.end
+
+    def step(self, input_state, dt, quality=0):
+        """Run one live step of the core and remember it"""
+        if (not self.keyframes or self.since_keyframe_ms >= KEYFRAME_BUDGET_MS
+                or self.since_keyframe_ticks >= KEYFRAME_INTERVAL):
+            self.add_keyframe()
+
+        row = self.end - self.start
+        if row == len(self.rows):
+            self.rows = np.concatenate((self.rows, np.zeros(len(self.rows), dtype=TICK_DTYPE)))
+        velocity = input_state.mouse_velocity
+        self.rows[row] = (dt, input_state.mouse_pos,
+                          (np.nan, np.nan) if velocity is None else velocity, quality)
+        if input_state.buttons_down or input_state.buttons_up or input_state.keys_down:
+            self.presses[self.end] = (input_state.buttons_down, input_state.buttons_up, input_state.keys_down)
+
+        started = time.perf_counter()
+        self.core.step(dt, input_state)
+        self.since_keyframe_ms += (time.perf_counter() - started) * 1000.0
+        self.since_keyframe_ticks += 1
+        self.tier = quality
+        self.end += 1
+        self.cursor = self.end
+
+    def add_keyframe(self):
+        core = self.core
+        state = pickle.dumps(tuple(getattr(core, name) for name in self.fields), pickle.HIGHEST_PROTOCOL)
+        self.keyframe_ticks.append(self.end)
+        self.keyframes.append(state)
+        self.keyframe_bytes += len(state)
+        self.since_keyframe_ms = 0.0
+        self.since_keyframe_ticks = 0
+        self.trim()
+
+    def trim(self):
+        """Drop the oldest keyframes, and the ticks before them, that are
+        out of reach or over the memory cap"""
+        ticks, keyframes = self.keyframe_ticks, self.keyframes
+        dropped = 0
+        while dropped < len(keyframes) - 1 and (
+                self.end - ticks[dropped + 1] >= self.max_ticks or self.keyframe_bytes > self.max_bytes):
+            self.keyframe_bytes -= len(keyframes[dropped])
+            dropped += 1
+        if not dropped:
+            return
+        del ticks[:dropped], keyframes[:dropped]
+
+        # Move the rows down once the unreachable ones fill half the array
+        first = ticks[0]
+        if (first - self.start) * 2 >= len(self.rows):
+            count = self.end - first
+            self.rows[:count] = self.rows[first - self.start:self.end - self.start]
+            self.start = first
+            self.presses = {tick: pressed for tick, pressed in self.presses.items() if tick >= first}
+
+    def input_at(self, tick):
+        """The InputState, dt and quality tier of a kept tick"""
+        row = self.rows[tick - self.start]
+        buttons_down, buttons_up, keys_down = self.presses.get(tick, ((), (), ()))
+        velocity = row["velocity"].tolist()
+        velocity = None if velocity[0] != velocity[0] else tuple(velocity)  # NaN: none recorded
+        return (InputState(tuple(row["mouse"].tolist()), buttons_down, buttons_up, keys_down, velocity),
+                float(row["dt"]), int(row["quality"]))
+
+    def seek(self, tick):
+        """Put the core back at tick (clamped to what is kept); returns it"""
+        tick = max(self.first, min(self.end, tick))
+        if tick == self.cursor:
+            return tick
+        core = self.core
+        profiler, core.profiler = core.profiler, None  # Replayed steps are not this frame's phases
+
+        # Restore the nearest keyframe unless stepping on from here is shorter
+        index = bisect_right(self.keyframe_ticks, tick) - 1
+        keyframe_tick = self.keyframe_ticks[index]
+        if tick < self.cursor or keyframe_tick > self.cursor:
+            for name, value in zip(self.fields, pickle.loads(self.keyframes[index])):
+                setattr(core, name, value)
+            self.cursor = keyframe_tick
+
+        tiers = self.quality_tiers
+        self.tier = None  # The app may have switched tiers since; set each step's again
+        while self.cursor < tick:
+            input_state, dt, quality = self.input_at(self.cursor)
+            if tiers is not None and quality != self.tier:
+                core.apply_quality(tiers[quality])
+            self.tier = quality
+            core.step(dt, input_state)
+            self.cursor += 1
+        core.profiler = profiler
+        return tick
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        """Carry on live from the cursor, forgetting the ticks after it"""
+        self.paused = False
+        if self.cursor == self.end:
+            return
+        tick = self.end = self.cursor
+        index = bisect_right(self.keyframe_ticks, tick)
+        for state in self.keyframes[index:]:
+            self.keyframe_bytes -= len(state)
+        del self.keyframe_ticks[index:], self.keyframes[index:]
+        self.presses = {t: pressed for t, pressed in self.presses.items() if t < tick}
+        if self.keyframe_ticks[-1] != tick:
+            self.since_keyframe_ms = float("inf")  # Keyframe the branch at its first step
+
+    def scrub_keys(self):
+        """While paused, move the cursor by the arrow keys held this frame"""
+        pressed = pygame.key.get_pressed()
+        direction = pressed[pygame.K_RIGHT] - pressed[pygame.K_LEFT]
+        if direction:
+            fast = pygame.key.get_mods() & pygame.KMOD_SHIFT
+            self.seek(self.cursor + direction * (SCRUB_FAST_TICKS if fast else SCRUB_TICKS))
+
+    def status(self):
+        """One-line description of the pause for the HUD"""
+        return (f"Paused {(self.cursor - self.end) / self.fps:+.2f} s / {(self.end - self.first) / self.fps:.1f} s"
+                f" | Left/Right: scrub, P: resume")
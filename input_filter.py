@@ -0,0 +1,122 @@
+"""Cursor velocity from every queued mouse-motion event.
+
+A frame's MOUSEMOTION events all arrive at once and carry no timestamps,
+so MouseTracker spreads them evenly over the time since the previous poll
+and feeds each one to a velocity filter. The estimate then tracks the
+real motion between frames instead of one position difference per frame,
+and does not change scale when the frame rate drops.
+
+Two filters share one interface, add(t, x, y) then .velocity in px/s:
+
+    AlphaBetaFilter      constant-velocity predictor, corrected by each sample
+    LeastSquaresFilter   slope of a straight-line fit over a short time window
+"""
+import math
+import time
+from collections import deque
+
+import pygame
+
+VELOCITY_FILTER = "alpha_beta"  # or "least_squares"
+ALPHA_BETA_RESPONSE = 0.01  # seconds; shorter follows faster but is noisier
+LEAST_SQUARES_WINDOW = 0.03  # seconds of samples in each fit
+
+
+class AlphaBetaFilter:
+    """Alpha-beta tracker: predict along the current velocity, then pull
+    position and velocity toward each new sample.
+
+    The gains come from the gap since the previous sample, critically
+    damped with the given response time, so the filter behaves the same
+    whatever the mouse's event rate.
+    """
+
+    def __init__(self, response_time=ALPHA_BETA_RESPONSE):
+        self.response_time = response_time
+        self.reset()
+
+    def reset(self):
+        self.t = None
+        self.x = self.y = 0.0
+        self.velocity = (0.0, 0.0)
+
+    def add(self, t, x, y):
+        if self.t is None:
+            self.t, self.x, self.y = t, float(x), float(y)
+            return
+        dt = t - self.t
+        if dt <= 0:
+            return
+        alpha = 1.0 - math.exp(-dt / self.response_time)
+        beta = alpha * alpha / (2.0 - alpha)
+        vx, vy = self.velocity
+        residual_x = x - (self.x + vx * dt)
+        residual_y = y - (self.y + vy * dt)
+        self.x += vx * dt + alpha * residual_x
+        self.y += vy * dt + alpha * residual_y
+        gain = beta / dt
+        self.velocity = (vx + gain * residual_x, vy + gain * residual_y)
+        self.t = t
+
+
+class LeastSquaresFilter:
+    """Velocity as the slope of a least-squares line through the samples of
+    the last window seconds"""
+
+    def __init__(self, window=LEAST_SQUARES_WINDOW):
+        self.window = window
+        self.samples = deque()
+        self.velocity = (0.0, 0.0)
+
+    def reset(self):
+        self.samples.clear()
+        self.velocity = (0.0, 0.0)
+
+    def add(self, t, x, y):
+        samples = self.samples
+        samples.append((t, x, y))
+        while len(samples) > 2 and samples[0][0] < t - self.window:
+            samples.popleft()
+
+        n = len(samples)
+        mean_t = sum(s[0] for s in samples) / n
+        mean_x = sum(s[1] for s in samples) / n
+        mean_y = sum(s[2] for s in samples) / n
+        var_t = sum((s[0] - mean_t) ** 2 for s in samples)
+        if var_t > 0:
+            self.velocity = (sum((s[0] - mean_t) * (s[1] - mean_x) for s in samples) / var_t,
+                             sum((s[0] - mean_t) * (s[2] - mean_y) for s in samples) / var_t)
+
+
+def make_velocity_filter(kind=VELOCITY_FILTER):
+    if kind == "alpha_beta":
+        return AlphaBetaFilter()
+    if kind == "least_squares":
+        return LeastSquaresFilter()
+    raise ValueError(f"unknown velocity filter {kind!r}")
+
+
+class MouseTracker:
+    """Live cursor velocity from the motion events of each frame"""
+
+    def __init__(self, velocity_filter=None):
+        self.filter = velocity_filter or make_velocity_filter()
+        self.last_poll = None
+
+    @property
+    def velocity(self):
+        return self.filter.velocity
+
+    def feed(self, events, mouse_pos, now=None):
+        """Add this frame's MOUSEMOTION events; now is the poll time in seconds"""
+        if now is None:
+            now = time.perf_counter()
+        positions = [event.pos for event in events if event.type == pygame.MOUSEMOTION]
+        if not positions:
+            positions = [mouse_pos]  # Holding still is a sample too
+        start = now if self.last_poll is None else self.last_poll
+        span = (now - start) / len(positions)
+        for k, (x, y) in enumerate(positions, 1):
+            self.filter.add(start + k * span, x, y)
+        self.last_poll = now
+        return self.filter.velocity
@@ -0,0 +1,91 @@
+"""Mach cone of a supersonic source, worked out from its recent path.
+
+Sound the source emitted at time tau is, at time t, a circle of radius
+c (t - tau) around s(tau). When the source outruns its sound those
+circles pile up along their envelope, the shock front, whose points
+satisfy both
+
+    |p - s(tau)| = c (t - tau)
+    (p - s(tau)) . s'(tau) = c |p - s(tau)|
+
+(the second is the first differentiated by tau). So from every past
+position the front lies at angle theta to the velocity, on both sides,
+with cos(theta) = c / |s'(tau)| = 1 / M. Each SourceHistory sample that
+was supersonic gives two front points, and every unbroken supersonic
+stretch of the path becomes one polygon: one flank from the oldest sample
+up to the newest and the other flank back again. For a steady straight
+pass that is exactly the cone of half-angle asin(1 / M); on a curving
+path it bends with the path.
+
+That is a few array operations over the history per frame, where showing
+the front with rings would take emitting one every step and drawing them
+all.
+"""
+import math
+
+import numpy as np
+
+MACH_VELOCITY_SPAN = 6  # samples either side of each one for its path velocity
+MACH_MAX_STEP = 100.0  # px between samples; longer is the cursor jumping, not moving
+MACH_FLANK_POINTS = 24  # vertices per flank; pygame fills few-sided polygons much faster
+
+
+def mach_number(velocity_x, velocity_y, sound_speed):
+    return math.hypot(velocity_x, velocity_y) / sound_speed
+
+
+def cone_half_angle(mach):
+    """Half-angle of the cone in degrees, or None below Mach 1"""
+    if mach <= 1.0:
+        return None
+    return math.degrees(math.asin(1.0 / mach))
+
+
+def cone_polygons(t, x, y, now, sound_speed, span=MACH_VELOCITY_SPAN, max_step=MACH_MAX_STEP,
+                  flank_points=MACH_FLANK_POINTS):
+    """Shock-front polygons at time now from source samples (t, x, y),
+    oldest first as SourceHistory.window() gives them: a list of (n, 2)
+    vertex arrays, one per supersonic stretch. Each polygon's first half
+    is one flank, oldest sample to newest, and its second half the other
+    flank back, each thinned to at most flank_points evenly spread
+    samples. Samples whose velocity span crosses a jump of more than
+    max_step are left out, so a jump splits the path instead of showing
+    as a source faster than anything moves."""
+    n = len(t)
+    if n < 2:
+        return []
+
+    # Path velocity by central differences over span samples each way,
+    # which evens out the whole-pixel steps of the cursor
+    index = np.arange(n)
+    lo = np.maximum(index - span, 0)
+    hi = np.minimum(index + span, n - 1)
+    dt = t[hi] - t[lo]
+    dt[dt <= 0] = np.inf
+    vx = (x[hi] - x[lo]) / dt
+    vy = (y[hi] - y[lo]) / dt
+    speed = np.hypot(vx, vy)
+    jumps = np.concatenate(([0], np.cumsum(np.hypot(np.diff(x), np.diff(y)) > max_step)))
+    fast = (speed > sound_speed) & (jumps[hi] == jumps[lo])
+    if not fast.any():
+        return []
+
+    # Front points at angle theta either side of the direction of travel
+    speed = np.where(fast, speed, 1.0)
+    cos = np.where(fast, sound_speed / speed, 0.0)
+    sin = np.sqrt(1.0 - cos * cos)
+    ux, uy = vx / speed, vy / speed
+    radius = sound_speed * np.maximum(now - t, 0.0)
+    ahead_x, ahead_y = x + radius * cos * ux, y + radius * cos * uy
+    side_x, side_y = -radius * sin * uy, radius * sin * ux
+    left = np.column_stack((ahead_x + side_x, ahead_y + side_y))
+    right = np.column_stack((ahead_x - side_x, ahead_y - side_y))
+
+    # One polygon per run of consecutive supersonic samples
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], fast.view(np.int8), [0]))))
+    polygons = []
+    for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        if end - start >= 2:
+            keep = np.unique(np.linspace(start, end - 1, flank_points).round().astype(int))
+            polygons.append(np.concatenate((left[keep], right[keep][::-1])))
+    return polygons
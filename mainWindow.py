@@ -2,9 +2,20 @@
 import pygame
 import sys
 import math
+import heapq
+from collections import deque
+import numpy as np
 
-# Initialize pygame
-pygame.init()
+from app_context import AppContext
+from dirty_rects import DirtyRects
+from frame_profiler import FrameProfiler
+from history import StateHistory
+from input_filter import MouseTracker, make_velocity_filter
+from object_pool import ObjectPool
+from quality import QualityGovernor
+from recording import InputRecorder
+from sim_input import InputState
+from text_cache import text_cache
 
 # Define constants
 BACKGROUND_COLOR = (255, 255, 255)
@@ -22,17 +33,141 @@ TRIANGLE_COLOR = (120, 120, 120)  # Grey color for triangle
 INTERFERENCE_CONSTRUCTIVE = (255, 100, 100)  # Red for constructive
 INTERFERENCE_DESTRUCTIVE = (100, 100, 255)   # Blue for destructive
 
-# Initialize screen and clock
-screen = pygame.display.set_mode(SCREEN_SIZE)
-pygame.display.set_caption('Dopple')
-clock = pygame.time.Clock()
-font = pygame.font.Font(None, 20)
-title_font = pygame.font.Font(None, 36)
-ui_font = pygame.font.Font(None, 18)
+# Interference detection
+INTERFERENCE_INTERVAL = 5  # Frames between interference passes
+INTERFERENCE_BAND = 20  # Max distance from a ring for a point to count as on it
+INTERFERENCE_SAMPLES = (0.3, 0.5, 0.7)  # Sample points along the line between centers
+INTERFERENCE_CELL_SIZE = 100  # Spatial hash cell size in pixels; fewer repeats of each pair than small cells
+INTERFERENCE_MERGE_CELL = 8  # Markers landing in the same cell (px) merge into one
+
+# Pooled game objects, preallocated once per game
+MAX_CIRCLES = 256  # Hard cap; spawning pauses while every circle is live
+MAX_INTERFERENCE_POINTS = 1024  # Hard cap; the oldest markers make room for new ones
+
+DIRTY_RECT_UPDATES = True  # Update only the changed parts of the window
+RECORD_INPUTS = False  # Keep every tick's input so F5 can save the game for replay; grows all session
+STATE_HISTORY = True  # Keyframes and input so P can pause and LEFT/RIGHT rewind
+
+# The game simulates at game_params['frame_rate'] ticks per second and
+# draws at its own rate, in between ticks where the two differ
+RENDER_FPS = 60  # Frames drawn per second; 0 draws as fast as possible
+MAX_TICKS_PER_FRAME = 5  # Catch-up limit after a stall
+
+# Detail the quality governor steps through when frames run over budget,
+# best first. Circles fainter than circle_min_alpha are not drawn, marker
+# alphas are rounded down to marker_alpha_step and max_interference_points
+# lowers the marker cap below MAX_INTERFERENCE_POINTS (None = no lower)
+QUALITY_TIERS = [
+    {'name': 'high', 'circle_min_alpha': 10, 'marker_alpha_step': 1,
+     'interference_interval': INTERFERENCE_INTERVAL, 'interference_samples': INTERFERENCE_SAMPLES,
+     'max_interference_points': None},
+    {'name': 'medium', 'circle_min_alpha': 30, 'marker_alpha_step': 16,
+     'interference_interval': 10, 'interference_samples': (0.3, 0.7),
+     'max_interference_points': 300},
+    {'name': 'low', 'circle_min_alpha': 60, 'marker_alpha_step': 32,
+     'interference_interval': 15, 'interference_samples': (0.5,),
+     'max_interference_points': 150},
+    {'name': 'minimum', 'circle_min_alpha': 100, 'marker_alpha_step': 64,
+     'interference_interval': 20, 'interference_samples': (0.5,),
+     'max_interference_points': 60},
+]
+ADAPTIVE_QUALITY = True  # Let the governor lower detail to hold the frame rate
+
+FONT_SIZE = 20
+TITLE_FONT_SIZE = 36
+UI_FONT_SIZE = 18
+
+# Window, clock and fonts come up on first use; importing opens nothing
+app = AppContext(SCREEN_SIZE, 'Dopple')
+
+class AlphaLayer:
+    """Reusable screen-sized SRCALPHA layer for translucent shapes.
+
+    Shapes are drawn into the layer at their screen position and the layer
+    is composited onto the target in batches. A batch is flushed early only
+    when the next shape overlaps it, so overlapping translucent shapes still
+    blend with each other exactly as if each had its own surface. The layer
+    has a margin around the screen so shapes crossing the edge rasterize the
+    same as they did on their own surfaces. Small ready-made sprites can be
+    queued with stamp() and go out in the same batched blit. The target
+    rects written since begin() are kept in drawn_rects.
+    """
+    def __init__(self, size, margin=128):
+        self.margin = margin
+        self.surface = pygame.Surface((size[0] + margin * 2, size[1] + margin * 2), pygame.SRCALPHA)
+        self.target = None
+        self.batch_rects = []
+        self.batch_circles = []
+        self.batch_fills = []
+        self.stamps = []
+        self.composites = 0
+        self.drawn_rects = []
+    
+    def begin(self, target):
+        self.target = target
+        self.composites = 0
+        self.drawn_rects = []
+    
+    def _reserve(self, rect):
+        if self.stamps or (self.batch_rects and rect.collidelist(self.batch_rects) != -1):
+            self.flush()
+    
+    def stamp(self, sprite, pos):
+        """Queue a pre-rendered SRCALPHA sprite for the next composite"""
+        self.stamps.append((sprite, pos))
+    
+    def circle(self, color, center, radius):
+        cx, cy = center[0] + self.margin, center[1] + self.margin
+        self._reserve(pygame.Rect(cx - radius, cy - radius, radius * 2, radius * 2))
+        self.batch_rects.append(pygame.draw.circle(self.surface, color, (cx, cy), radius))
+        self.batch_circles.append(((cx, cy), radius))
+    
+    def polygon(self, color, outline_color, points, bounds):
+        m = self.margin
+        points = [(px + m, py + m) for px, py in points]
+        bounds = bounds.move(m, m)
+        self._reserve(bounds)
+        # Shapes are clipped to their own bounds, as their old surfaces were
+        self.surface.set_clip(bounds)
+        pygame.draw.polygon(self.surface, color, points)
+        pygame.draw.polygon(self.surface, outline_color, points, 2)
+        self.surface.set_clip(None)
+        bounds = bounds.clip(self.surface.get_rect())
+        self.batch_rects.append(bounds)
+        self.batch_fills.append(bounds)
+    
+    def flush(self):
+        """Composite everything drawn since the last flush onto the target"""
+        if self.batch_rects:
+            m = self.margin
+            self.drawn_rects.extend(self.target.blits([(self.surface, (rect.x - m, rect.y - m), rect)
+                                                       for rect in self.batch_rects]))
+            # Erase only the pixels that were drawn; cheaper than clearing the rects
+            for center, radius in self.batch_circles:
+                pygame.draw.circle(self.surface, (0, 0, 0, 0), center, radius)
+            for rect in self.batch_fills:
+                self.surface.fill((0, 0, 0, 0), rect)
+            self.composites += 1
+        if self.stamps:
+            self.drawn_rects.extend(self.target.blits(self.stamps))
+            self.composites += 1
+        self.batch_rects = []
+        self.batch_circles = []
+        self.batch_fills = []
+        self.stamps = []
+
+_alpha_layers = {}
+
+def get_alpha_layer(size):
+    """The shared AlphaLayer for targets of this size, built on first use"""
+    layer = _alpha_layers.get(size)
+    if layer is None:
+        layer = _alpha_layers[size] = AlphaLayer(size)
+    return layer
 
 # Game parameters (configurable via menu)
 game_params = {
-    'frame_rate': 20,
+    'frame_rate': 20,  # Simulation ticks per second; the other rates are per tick
     'spawn_rate': 10,
     'expansion_rate': 2,
     'max_radius': 200,
@@ -81,25 +216,31 @@ class TextBox:
         except ValueError:
             return self.min_val
     
+    def look(self):
+        """Everything draw() depends on, to spot when a redraw is needed"""
+        return (self.active, self.text, self.active and self.cursor_visible)
+    
     def draw(self, surface):
+        """Draw the box and its label; returns the rect covered"""
         color = TEXTBOX_ACTIVE_COLOR if self.active else TEXTBOX_COLOR
-        pygame.draw.rect(surface, color, self.rect)
+        drawn = pygame.draw.rect(surface, color, self.rect)
         pygame.draw.rect(surface, TEXTBOX_BORDER_COLOR, self.rect, 2)
         
         # Draw label above textbox
-        label_text = font.render(self.label, True, MENU_TEXT_COLOR)
-        surface.blit(label_text, (self.rect.x, self.rect.y - 25))
+        label_text = text_cache.render(app.font(FONT_SIZE), self.label, True, MENU_TEXT_COLOR)
+        drawn = drawn.union(surface.blit(label_text, (self.rect.x, self.rect.y - 25)))
         
         # Draw text
-        text_surface = font.render(self.text, True, MENU_TEXT_COLOR)
-        surface.blit(text_surface, (self.rect.x + 5, self.rect.y + 5))
+        text_surface = text_cache.render(app.font(FONT_SIZE), self.text, True, MENU_TEXT_COLOR)
+        drawn = drawn.union(surface.blit(text_surface, (self.rect.x + 5, self.rect.y + 5)))
         
         # Draw cursor
         if self.active and self.cursor_visible:
             cursor_x = self.rect.x + 5 + text_surface.get_width()
-            pygame.draw.line(surface, MENU_TEXT_COLOR, 
-                           (cursor_x, self.rect.y + 5), 
-                           (cursor_x, self.rect.y + self.rect.height - 5), 2)
+            drawn = drawn.union(pygame.draw.line(surface, MENU_TEXT_COLOR, 
+                                                 (cursor_x, self.rect.y + 5), 
+                                                 (cursor_x, self.rect.y + self.rect.height - 5), 2))
+        return drawn
 
 class Button:
     def __init__(self, x, y, width, height, text, action):
@@ -115,14 +256,18 @@ class Button:
             if self.rect.collidepoint(event.pos):
                 self.action()
     
+    def look(self):
+        return self.hovered
+    
     def draw(self, surface):
+        """Draw the button; returns the rect covered"""
         color = (90, 150, 200) if self.hovered else BUTTON_COLOR
-        pygame.draw.rect(surface, color, self.rect)
+        drawn = pygame.draw.rect(surface, color, self.rect)
         pygame.draw.rect(surface, MENU_TEXT_COLOR, self.rect, 2)
         
-        text_surface = font.render(self.text, True, BUTTON_TEXT_COLOR)
+        text_surface = text_cache.render(app.font(FONT_SIZE), self.text, True, BUTTON_TEXT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
-        surface.blit(text_surface, text_rect)
+        return drawn.union(surface.blit(text_surface, text_rect))
 
 class MenuState:
     def __init__(self):
@@ -148,6 +293,7 @@ class MenuState:
         self.start_button = Button(center_x - 50, start_y + spacing * 5 + 20, 
                                  100, 40, "START", self.start_game)
         self.running = True
+        self.widget_looks = {}  # widget -> (look, rect) when last drawn
     
     def start_game(self):
         for i, param_key in enumerate(['frame_rate', 'spawn_rate', 'expansion_rate', 
@@ -164,36 +310,57 @@ class MenuState:
         for textbox in self.textboxes:
             textbox.update()
     
-    def draw(self, surface):
+    def draw_background(self, surface):
+        """The parts of the menu that never change"""
         surface.fill(MENU_BG_COLOR)
         
         # Title
-        title_text = title_font.render("DOPPLE", True, MENU_TEXT_COLOR)
+        title_text = text_cache.render(app.font(TITLE_FONT_SIZE), "DOPPLE", True, MENU_TEXT_COLOR)
         title_rect = title_text.get_rect(center=(SCREEN_SIZE[0]//2, 40))
         surface.blit(title_text, title_rect)
         
         # Subtitle
-        subtitle_text = font.render("Wave Interference Simulator", True, MENU_TEXT_COLOR)
+        subtitle_text = text_cache.render(app.font(FONT_SIZE), "Wave Interference Simulator", True, MENU_TEXT_COLOR)
         subtitle_rect = subtitle_text.get_rect(center=(SCREEN_SIZE[0]//2, 65))
         surface.blit(subtitle_text, subtitle_rect)
-        
-        for textbox in self.textboxes:
-            textbox.draw(surface)
-        self.start_button.draw(surface)
+    
+    def draw_changed(self, dirty):
+        """Redraw only the widgets whose look changed since they were last drawn"""
+        for widget in self.textboxes + [self.start_button]:
+            look = widget.look()
+            last = self.widget_looks.get(widget)
+            if last is not None and last[0] == look:
+                continue
+            if last is not None:
+                dirty.restore(last[1])
+            rect = widget.draw(dirty.surface)
+            dirty.damage(rect)
+            self.widget_looks[widget] = (look, rect)
 
 class ExpandingCircle:
-    __slots__ = ['x', 'y', 'radius', 'alpha', 'color', 'max_radius']
+    __slots__ = ['id', 'x', 'y', 'radius', 'alpha', 'color', 'max_radius', 'expansion_rate']
+    
+    def __init__(self, x=0, y=0, use_blue=True, circle_id=None, params=None):
+        self.spawn(x, y, use_blue, circle_id, params)
     
-    def __init__(self, x, y, use_blue=True):
+    def spawn(self, x, y, use_blue=True, circle_id=None, params=None):
+        """Start the circle afresh at (x, y); pooled circles are reused this way.
+        
+        Growth comes from params (the owning core's, game_params by default).
+        """
+        if params is None:
+            params = game_params
+        self.id = circle_id  # Stable for the circle's whole life
         self.x = x
         self.y = y
         self.radius = 1
         self.alpha = 255
         self.color = BLUE_COLOR if use_blue else LIGHT_BLUE_COLOR
-        self.max_radius = game_params['max_radius']
+        self.max_radius = params['max_radius']
+        self.expansion_rate = params['expansion_rate']
     
     def update(self):
-        self.radius += game_params['expansion_rate']
+        self.radius += self.expansion_rate
         
         if self.radius >= self.max_radius:
             return True
@@ -202,13 +369,18 @@ class ExpandingCircle:
         self.alpha = max(0, int(255 * fade_ratio))
         return False
     
-    def draw(self, surface):
-        if self.alpha > 10:  # Skip nearly invisible circles
-            diameter = self.radius * 2
-            circle_surface = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
-            color_with_alpha = (*self.color, self.alpha)
-            pygame.draw.circle(circle_surface, color_with_alpha, (self.radius, self.radius), self.radius)
-            surface.blit(circle_surface, (self.x - self.radius, self.y - self.radius))
+    def draw(self, layer, blend=0.0, min_alpha=10):
+        """Draw blend of the way (0-1) from this tick to the next"""
+        radius = self.radius
+        alpha = self.alpha
+        if blend:
+            radius += blend * self.expansion_rate
+            if radius >= self.max_radius:
+                return
+            alpha = max(0, int(255 * (1.0 - radius / self.max_radius)))
+        if alpha > min_alpha:  # Skip nearly invisible circles
+            color_with_alpha = (*self.color, alpha)
+            layer.circle(color_with_alpha, (self.x, self.y), radius)
     
     def get_distance_to_point(self, x, y):
         dx = self.x - x
@@ -222,25 +394,20 @@ class CollisionDetector:
     def __init__(self, x, y):
         self.x = x
         self.y = y
-        self.collision_history = []
+        self.collision_history = deque()
         self.current_collisions_per_second = 0.0
-        self.colliding_circles = set()
+        self.last_circle_id = None
         self.size = 10
     
-    def check_collision(self, circle, circle_id):
-        current_time = pygame.time.get_ticks()
-        is_colliding = circle.is_colliding_with_point(self.x, self.y)
-        
-        if is_colliding and circle_id not in self.colliding_circles:
-            self.collision_history.append(current_time)
-            self.colliding_circles.add(circle_id)
-        elif not is_colliding and circle_id in self.colliding_circles:
-            self.colliding_circles.discard(circle_id)
+    def record_hit(self, circle_id, current_time):
+        """Count a circle reaching the detector (called by DetectorEvents)"""
+        self.collision_history.append(current_time)
+        self.last_circle_id = circle_id
     
-    def update(self):
-        current_time = pygame.time.get_ticks()
+    def update(self, current_time):
         cutoff_time = current_time - 1000
-        self.collision_history = [t for t in self.collision_history if t > cutoff_time]
+        while self.collision_history and self.collision_history[0] <= cutoff_time:
+            self.collision_history.popleft()
         self.current_collisions_per_second = len(self.collision_history)
     
     def get_collisions_per_second(self):
@@ -252,7 +419,7 @@ class CollisionDetector:
         
         detector_rect = pygame.Rect(self.x - self.size//2, self.y - self.size//2, 
                                   self.size, self.size)
-        pygame.draw.rect(surface, detector_color, detector_rect)
+        drawn = pygame.draw.rect(surface, detector_color, detector_rect)
         pygame.draw.rect(surface, outline_color, detector_rect, 2)
         
         # Center cross
@@ -260,9 +427,73 @@ class CollisionDetector:
                         (self.x - 3, self.y), (self.x + 3, self.y), 1)
         pygame.draw.line(surface, outline_color,
                         (self.x, self.y - 3), (self.x, self.y + 3), 1)
+        return drawn
+
+_marker_sprites = {}
+
+def get_marker_sprite(color, alpha, size):
+    """Small filled-circle sprite for interference markers, built once per look"""
+    key = (color, alpha, size)
+    sprite = _marker_sprites.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*color, alpha), (size, size), size)
+        _marker_sprites[key] = sprite
+    return sprite
+
+class DetectorEvents:
+    """Predicts when circles reach detectors and replays the hits in order.
+
+    A circle's radius grows by a fixed expansion_rate per frame, so the frame
+    in which it first covers a detector is known when the circle spawns (or
+    when the detector is placed). Each crossing goes into a heap keyed on its
+    frame, and only the events that are due get popped each frame.
+    """
+    def __init__(self):
+        self.heap = []
+        self.seq = 0  # Tie-breaker keeps same-frame events in schedule order
+    
+    def schedule(self, circle, detector_index, detector, frame):
+        """Queue the crossing of one circle over one detector.
+
+        frame is the frame whose update will next grow the circle.
+        """
+        distance = circle.get_distance_to_point(detector.x, detector.y)
+        rate = circle.expansion_rate
+        steps = max(1, math.ceil((distance - circle.radius) / rate))
+        if circle.radius + steps * rate >= circle.max_radius:
+            return  # Circle expires before it gets there
+        heapq.heappush(self.heap, (frame + steps - 1, self.seq, detector_index, circle.id))
+        self.seq += 1
+    
+    def add_circle(self, circle, detectors, frame):
+        for index, detector in enumerate(detectors):
+            self.schedule(circle, index, detector, frame)
+    
+    def add_detector(self, detectors, circles, frame):
+        """Schedule the live circles against the newest detector"""
+        index = len(detectors) - 1
+        for circle in circles:
+            self.schedule(circle, index, detectors[index], frame)
+    
+    def pop_due(self, frame, detectors, current_time):
+        """Record every crossing due by this frame; returns how many fired"""
+        fired = 0
+        while self.heap and self.heap[0][0] <= frame:
+            _, _, detector_index, circle_id = heapq.heappop(self.heap)
+            detectors[detector_index].record_hit(circle_id, current_time)
+            fired += 1
+        return fired
 
 class InterferencePoint:
-    def __init__(self, x, y, interference_type, intensity):
+    __slots__ = ['x', 'y', 'type', 'intensity', 'life_timer', 'cell']
+    
+    def __init__(self, x=0.0, y=0.0, interference_type='constructive', intensity=0.0):
+        self.cell = None  # Merge cell while pooled by a GameCore
+        self.spawn(x, y, interference_type, intensity)
+    
+    def spawn(self, x, y, interference_type, intensity):
+        """Show the marker afresh; pooled markers are reused this way"""
         self.x = x
         self.y = y
         self.type = interference_type  # 'constructive' or 'destructive'
@@ -273,19 +504,19 @@ class InterferencePoint:
         self.life_timer -= 1
         return self.life_timer <= 0
     
-    def draw(self, surface):
-        if self.life_timer > 0:
-            alpha = int(255 * (self.life_timer / 30))
+    def draw(self, layer, blend=0.0, alpha_step=1):
+        life = self.life_timer - blend
+        if life > 0:
+            alpha = int(255 * (life / 30)) // alpha_step * alpha_step
+            if not alpha:
+                return
             color = INTERFERENCE_CONSTRUCTIVE if self.type == 'constructive' else INTERFERENCE_DESTRUCTIVE
             
             # Draw small circle
             size = int(4 + self.intensity * 3)
-            circle_surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-            color_with_alpha = (*color, alpha)
-            pygame.draw.circle(circle_surface, color_with_alpha, (size, size), size)
-            surface.blit(circle_surface, (self.x - size, self.y - size))
+            layer.stamp(get_marker_sprite(color, alpha, size), (self.x - size, self.y - size))
 
-def draw_cutting_triangle(surface, x, y, dx, dy, intensity=1.0):
+def draw_cutting_triangle(layer, x, y, dx, dy, intensity=1.0):
     """Draw single large grey triangle pointing in movement direction"""
     if dx == 0 and dy == 0:
         return
@@ -306,20 +537,19 @@ def draw_cutting_triangle(surface, x, y, dx, dy, intensity=1.0):
     base2_y = y - math.sin(perp_angle) * base_width
     
     alpha = max(100, int(200 * intensity))
-    triangle_surface = pygame.Surface((size * 3, size * 3), pygame.SRCALPHA)
     
+    # Place the triangle on the same pixel grid its own surface would use
     center = size * 1.5
+    left, top = int(x - center), int(y - center)
     points = [
-        (tip_x - x + center, tip_y - y + center),
-        (base1_x - x + center, base1_y - y + center),
-        (base2_x - x + center, base2_y - y + center)
+        (int(tip_x - x + center) + left, int(tip_y - y + center) + top),
+        (int(base1_x - x + center) + left, int(base1_y - y + center) + top),
+        (int(base2_x - x + center) + left, int(base2_y - y + center) + top)
     ]
+    bounds = pygame.Rect(left, top, int(size * 3), int(size * 3))
     
     color_with_alpha = (*TRIANGLE_COLOR, alpha)
-    pygame.draw.polygon(triangle_surface, color_with_alpha, points)
-    pygame.draw.polygon(triangle_surface, (80, 80, 80, alpha), points, 2)
-    
-    surface.blit(triangle_surface, (x - center, y - center))
+    layer.polygon(color_with_alpha, (80, 80, 80, alpha), points, bounds)
 
 def detect_wave_interference(circles):
     """Detect constructive and destructive interference points"""
@@ -359,149 +589,516 @@ def detect_wave_interference(circles):
     
     return interference_points
 
+class InterferenceEngine:
+    """Spatial-hash broad phase plus vectorized narrow phase for wave interference.
+
+    Produces the same points as detect_wave_interference. Every sample point
+    lies on the segment between two circle centers and within
+    INTERFERENCE_BAND of both rings, so only pairs whose ring bands share a
+    grid cell inside the bounding box of the centers can interfere, and in
+    that cell the two centers are on opposite sides (or level with it). The
+    circles are bucketed by the cells their bands cross, pairs come only
+    from compatible buckets of one cell, and those candidate pairs are then
+    tested together as NumPy arrays.
+    """
+    # Bucket pairs (a <= b) that can share a sample point. A bucket is a
+    # cell's circles whose centers are on one side of it: side_x * 3 + side_y
+    # + 4, sides -1, 0 or 1. Two centers both left of the cell (or both
+    # right, above or below) have no point of the cell between them
+    SIDE_PAIRS = np.array([(a, b) for a in range(9) for b in range(a, 9)
+                           if not a // 3 == b // 3 != 1 and not a % 3 == b % 3 != 1]).T
+    
+    def __init__(self, cell_size=INTERFERENCE_CELL_SIZE, band=INTERFERENCE_BAND,
+                 samples=INTERFERENCE_SAMPLES):
+        self.cell_size = cell_size
+        self.band = band
+        self.samples = samples
+        self.candidate_count = 0
+    
+    def candidate_pairs(self, x, y, r):
+        """Index pairs (i < j) whose ring bands share a grid cell with their
+        centers on opposite sides of it, in row-major order"""
+        n = len(x)
+        cell = self.cell_size
+        band = self.band
+        
+        # Grid over the bounding box of the centers; sample points never leave it
+        x0, y0 = x.min(), y.min()
+        cols = int((x.max() - x0) // cell) + 1
+        rows = int((y.max() - y0) // cell) + 1
+        
+        # The cells each circle's outer edge can reach, clipped to the grid
+        reach = r + band
+        col_lo = np.clip(np.ceil((x - reach - x0) / cell).astype(np.int64) - 1, 0, cols - 1)
+        col_hi = np.clip(((x + reach - x0) // cell).astype(np.int64), 0, cols - 1)
+        row_lo = np.clip(np.ceil((y - reach - y0) / cell).astype(np.int64) - 1, 0, rows - 1)
+        row_hi = np.clip(((y + reach - y0) // cell).astype(np.int64), 0, rows - 1)
+        width = col_hi - col_lo + 1
+        counts = width * (row_hi - row_lo + 1)
+        owner = np.repeat(np.arange(n), counts)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = width[owner]
+        col = col_lo[owner] + offset % width
+        row = row_lo[owner] + offset // width
+        
+        # Keep the cells the ring band crosses: nearest point within r + band
+        # of the center and farthest beyond r - band (squared, no roots)
+        left = x0 + col * cell - x[owner]
+        top = y0 + row * cell - y[owner]
+        near_sq = (np.maximum(0, np.maximum(left, -left - cell)) ** 2
+                   + np.maximum(0, np.maximum(top, -top - cell)) ** 2)
+        far_sq = np.maximum(np.abs(left), np.abs(left + cell)) ** 2 + np.maximum(np.abs(top), np.abs(top + cell)) ** 2
+        radius = r[owner]
+        hit = np.nonzero((near_sq <= (radius + band) ** 2) & (far_sq >= np.maximum(radius - band, 0) ** 2))
+        
+        # Bucket the hits by cell and by the side of the cell the center is on
+        left, top = left[hit], top[hit]
+        side_x = (left + cell < 0).astype(np.int64) - (left > 0)
+        side_y = (top + cell < 0).astype(np.int64) - (top > 0)
+        bucket = (row[hit] * cols + col[hit]) * 9 + side_x * 3 + side_y + 4
+        owner = owner[hit][np.argsort(bucket, kind='stable')]
+        owner = owner.astype(np.int32 if n * n < 2 ** 31 else np.int64)  # Pair keys below fit
+        sizes = np.bincount(bucket, minlength=rows * cols * 9).astype(np.int32)
+        starts = (np.cumsum(sizes, dtype=np.int32) - sizes).reshape(-1, 9)
+        sizes = sizes.reshape(-1, 9)
+        
+        # Every circle of one bucket against every circle of the other, for
+        # each compatible pair of buckets in a cell
+        side_a, side_b = self.SIDE_PAIRS
+        size_a, size_b = sizes[:, side_a], sizes[:, side_b]
+        blocks = np.nonzero(size_a * size_b)
+        size_a, size_b = size_a[blocks], size_b[blocks]
+        start_a, start_b = starts[:, side_a][blocks], starts[:, side_b][blocks]
+        counts = size_a * size_b
+        offset = np.arange(counts.sum(), dtype=np.int32) - np.repeat(np.cumsum(counts, dtype=np.int32) - counts, counts)
+        step_a, step_b = np.divmod(offset, np.repeat(size_b, counts))
+        first = owner[np.repeat(start_a, counts) + step_a]
+        second = owner[np.repeat(start_b, counts) + step_b]
+        
+        # A pair sharing several cells comes out once per cell (and both ways
+        # round within a bucket); sorting the pair keys puts repeats together
+        # and the result in row-major order
+        keys = np.minimum(first, second) * n + np.maximum(first, second)
+        keys = keys[first != second]
+        keys.sort()
+        fresh = np.ones(len(keys), dtype=bool)
+        fresh[1:] = keys[1:] != keys[:-1]
+        keys = keys[fresh]
+        return keys // n, keys % n
+    
+    def detect(self, circles):
+        """Return InterferencePoints for the circles, in the legacy order"""
+        px, py, constructive, intensity = self.detect_arrays(circles)
+        return [InterferencePoint(x, y, 'constructive' if c else 'destructive', k)
+                for x, y, c, k in zip(px.tolist(), py.tolist(),
+                                      constructive.tolist(), intensity.tolist())]
+    
+    def detect_arrays(self, circles):
+        """Interference points as arrays (x, y, constructive, intensity)"""
+        empty = np.empty(0)
+        if len(circles) < 2:
+            return empty, empty, empty.astype(bool), empty
+        x = np.array([c.x for c in circles], dtype=float)
+        y = np.array([c.y for c in circles], dtype=float)
+        r = np.array([c.radius for c in circles], dtype=float)
+        alpha = np.array([c.alpha for c in circles], dtype=float)
+        
+        i, j = self.candidate_pairs(x, y, r)
+        self.candidate_count = len(i)
+        if not len(i):
+            return empty, empty, empty.astype(bool), empty
+        
+        # Same far-apart skip as the pairwise loop. A sample point within the
+        # band of both rings also needs the center distance within two bands
+        # of r1 + r2, which discards most candidates before the sample tests
+        gap = np.hypot(x[i] - x[j], y[i] - y[j]) - (r[i] + r[j])
+        keep = (gap <= 50) & (np.abs(gap) < 2 * self.band + 1e-6)
+        i, j = i[keep], j[keep]
+        xi, yi, ri, ai = x[i, None], y[i, None], r[i, None], alpha[i, None]
+        xj, yj, rj, aj = x[j, None], y[j, None], r[j, None], alpha[j, None]
+        
+        # Test every sample point of every pair at once: shape (pairs, samples)
+        t = np.array(self.samples)[None, :]
+        test_x = xi + t * (xj - xi)
+        test_y = yi + t * (yj - yi)
+        dist1 = np.hypot(xi - test_x, yi - test_y)
+        dist2 = np.hypot(xj - test_x, yj - test_y)
+        hit = (np.abs(dist1 - ri) < self.band) & (np.abs(dist2 - rj) < self.band)
+        
+        pair_idx, sample_idx = np.nonzero(hit)  # Row-major keeps (i, j, t) order
+        dist1, dist2 = dist1[pair_idx, sample_idx], dist2[pair_idx, sample_idx]
+        ai, aj = ai[pair_idx, 0], aj[pair_idx, 0]
+        
+        phase_diff = np.abs(dist1 - dist2) % (2 * math.pi)
+        constructive = (phase_diff < math.pi / 2) | (phase_diff > 3 * math.pi / 2)
+        intensity = np.where(constructive, (ai + aj) / 510.0, np.abs(ai - aj) / 255.0)
+        
+        return test_x[pair_idx, sample_idx], test_y[pair_idx, sample_idx], constructive, intensity
+
 def run_menu():
+    screen = app.screen
     menu = MenuState()
+    background = pygame.Surface(SCREEN_SIZE).convert()
+    menu.draw_background(background)
+    dirty = DirtyRects(screen, background, DIRTY_RECT_UPDATES)
     
     while menu.running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            elif event.type == pygame.VIDEOEXPOSE:
+                dirty.invalidate()
             menu.handle_event(event)
         
         menu.update()
-        menu.draw(screen)
-        pygame.display.flip()
-        clock.tick(30)
+        # Only widgets that changed are redrawn, unless the whole window is
+        if dirty.full_redraw:
+            menu.widget_looks.clear()
+        dirty.erase()
+        menu.draw_changed(dirty)
+        dirty.present()
+        if app.first_frame():
+            pygame.quit()
+            sys.exit()
+        app.clock.tick(30)
 
-def run_game():
-    circles = []
-    circle_count = 0
-    previous_mouse_pos = pygame.mouse.get_pos()
-    mouse_held = False
-    circle_spawn_timer = 0
-    show_cutting_effect = False
-    mouse_dx = 0
-    mouse_dy = 0
-    collision_detectors = []
-    interference_points = []
+class GameCore:
+    """Headless wave game: circles, detectors and interference.
+
+    Advanced only through step(dt, input_state). Every step is one game
+    frame (the rates in game_params are per frame). dt drives the
+    simulation clock used for the detector Hz readouts and turns the
+    filtered mouse velocity into the per-frame mouse movement that the
+    speed threshold is checked against.
+    """
+    # The attributes step() reads and writes; history.StateHistory keyframes
+    # these. Each pool goes with its live list so the two stay one object
+    HISTORY_FIELDS = ('sim_time', 'frame_count', 'circle_pool', 'circles', 'circle_count',
+                      'velocity_filter', 'mouse_pos', 'mouse_held', 'circle_spawn_timer',
+                      'show_cutting_effect', 'mouse_dx', 'mouse_dy', 'mouse_speed_squared',
+                      'collision_detectors', 'marker_pool', 'interference_points', 'marker_cells',
+                      'detector_events')
     
-    running = True
-    while running:
-        current_mouse_pos = pygame.mouse.get_pos()
+    def __init__(self, params=None):
+        self.params = game_params if params is None else params
+        self.sim_time = 0.0  # milliseconds
+        self.frame_count = 0
         
-        # Calculate mouse movement
-        mouse_dx = current_mouse_pos[0] - previous_mouse_pos[0]
-        mouse_dy = current_mouse_pos[1] - previous_mouse_pos[1]
-        mouse_speed_squared = mouse_dx * mouse_dx + mouse_dy * mouse_dy
-        threshold_squared = game_params['speed_threshold'] * game_params['speed_threshold']
+        self.circle_pool = ObjectPool(ExpandingCircle, MAX_CIRCLES)
+        self.circles = self.circle_pool.live  # Changed only in place
+        self.circle_count = 0
+        self.velocity_filter = make_velocity_filter()  # For inputs without a velocity
+        self.mouse_pos = (0, 0)
+        self.mouse_held = False
+        self.circle_spawn_timer = 0
+        self.show_cutting_effect = False
+        self.mouse_dx = 0
+        self.mouse_dy = 0
+        self.mouse_speed_squared = 0
+        self.collision_detectors = []
+        self.marker_pool = ObjectPool(InterferencePoint, MAX_INTERFERENCE_POINTS)
+        self.interference_points = self.marker_pool.live  # Changed only in place
+        self.marker_cells = {}  # Merge cell -> the live marker in it
+        self.interference_engine = InterferenceEngine()
+        self.detector_events = DetectorEvents()
+        self.profiler = None  # Optional FrameProfiler marking the step phases
+        self.apply_quality(QUALITY_TIERS[0])
+    
+    def apply_quality(self, settings):
+        """Switch detection and drawing detail to one of the QUALITY_TIERS"""
+        self.quality_name = settings['name']
+        self.circle_min_alpha = settings['circle_min_alpha']
+        self.marker_alpha_step = settings['marker_alpha_step']
+        self.interference_interval = settings['interference_interval']
+        self.interference_engine.samples = settings['interference_samples']
+        self.max_interference_points = settings['max_interference_points']
+    
+    @property
+    def fixed_dt(self):
+        """Seconds per simulation step at the configured frame rate"""
+        return 1.0 / self.params['frame_rate']
+    
+    def step(self, dt, input_state):
+        """Advance the game by one frame of dt seconds"""
+        params = self.params
+        self.sim_time += dt * 1000.0
+        current_mouse_pos = input_state.mouse_pos
         
-        show_cutting_effect = mouse_speed_squared > threshold_squared
-        previous_mouse_pos = current_mouse_pos
+        # Mouse movement per frame, from the filtered velocity
+        velocity = input_state.mouse_velocity
+        if velocity is None:
+            self.velocity_filter.add(self.sim_time / 1000.0, *current_mouse_pos)
+            velocity = self.velocity_filter.velocity
+        self.mouse_pos = current_mouse_pos
+        self.mouse_dx = velocity[0] * dt
+        self.mouse_dy = velocity[1] * dt
+        self.mouse_speed_squared = self.mouse_dx * self.mouse_dx + self.mouse_dy * self.mouse_dy
+        threshold_squared = params['speed_threshold'] * params['speed_threshold']
         
-        # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return True
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left click
-                    mouse_held = True
-                    circle_spawn_timer = 0
-                elif event.button == 3:  # Right click
-                    collision_detectors.append(CollisionDetector(current_mouse_pos[0], current_mouse_pos[1]))
-            elif event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 1:
-                    mouse_held = False
+        self.show_cutting_effect = self.mouse_speed_squared > threshold_squared
+        
+        # Handle presses
+        for button in input_state.buttons_down:
+            if button == 1:  # Left click
+                self.mouse_held = True
+                self.circle_spawn_timer = 0
+            elif button == 3:  # Right click
+                self.collision_detectors.append(CollisionDetector(current_mouse_pos[0], current_mouse_pos[1]))
+                self.detector_events.add_detector(self.collision_detectors, self.circles, self.frame_count)
+        for button in input_state.buttons_up:
+            if button == 1:
+                self.mouse_held = False
         
         # Spawn circles
-        if mouse_held:
-            circle_spawn_timer += 1
-            if circle_spawn_timer >= game_params['spawn_rate']:
-                use_blue = (circle_count & 1) == 0
-                circles.append(ExpandingCircle(current_mouse_pos[0], current_mouse_pos[1], use_blue))
-                circle_count += 1
-                circle_spawn_timer = 0
-        
-        # Update circles and check collisions
-        updated_circles = []
-        for i, circle in enumerate(circles):
-            if not circle.update():
-                updated_circles.append(circle)
-                
-                for detector in collision_detectors:
-                    detector.check_collision(circle, i + circle_count * 1000)
+        if self.mouse_held:
+            self.circle_spawn_timer += 1
+            if self.circle_spawn_timer >= params['spawn_rate']:
+                circle = self.circle_pool.acquire()
+                if circle is not None:
+                    use_blue = (self.circle_count & 1) == 0
+                    circle.spawn(current_mouse_pos[0], current_mouse_pos[1], use_blue, self.circle_count, params)
+                    self.detector_events.add_circle(circle, self.collision_detectors, self.frame_count)
+                    self.circle_count += 1
+                self.circle_spawn_timer = 0
         
-        circles = updated_circles
+        # Update circles, then record the detector crossings due this frame
+        self.circle_pool.sweep(ExpandingCircle.update)
+        if self.profiler:
+            self.profiler.mark("update_circles")
+        self.detector_events.pop_due(self.frame_count, self.collision_detectors, self.sim_time)
         
         # Update detectors
-        for detector in collision_detectors:
-            detector.update()
+        for detector in self.collision_detectors:
+            detector.update(self.sim_time)
+        if self.profiler:
+            self.profiler.mark("detectors")
         
         # Detect wave interference (limit frequency for performance)
-        if len(circles) > 1 and pygame.time.get_ticks() % 5 == 0:  # Every 5 frames
-            new_interference = detect_wave_interference(circles)
-            interference_points.extend(new_interference)
+        if len(self.circles) > 1 and self.frame_count % self.interference_interval == 0:
+            self.add_markers(*self.interference_engine.detect_arrays(self.circles))
         
-        # Update interference points
-        interference_points[:] = [point for point in interference_points if not point.update()]
+        # Update interference points, recycling the expired ones
+        self.marker_pool.sweep(self.expire_marker)
+        if self.profiler:
+            self.profiler.mark("interference")
         
-        # Draw everything
-        screen.fill(BACKGROUND_COLOR)
+        self.frame_count += 1
+    
+    def add_markers(self, xs, ys, constructive, intensity):
+        """Show interference points from InterferenceEngine.detect_arrays.
         
-        # Draw circles
-        for circle in circles:
-            circle.draw(screen)
-        
-        # Draw interference points
-        for point in interference_points:
-            point.draw(screen)
-        
-        # Draw collision detectors
-        for detector in collision_detectors:
-            detector.draw(screen)
-        
-        # Draw cutting triangle
-        if show_cutting_effect:
-            intensity = min(1.0, math.sqrt(mouse_speed_squared) / (game_params['speed_threshold'] * 3))
-            draw_cutting_triangle(screen, current_mouse_pos[0], current_mouse_pos[1], 
-                                mouse_dx, mouse_dy, intensity)
-        
-        # Draw UI
-        y_offset = 10
-        ui_text = ui_font.render("ESC: Menu | Left: Spawn | Right: Detector", True, (100, 100, 100))
-        screen.blit(ui_text, (10, y_offset))
-        
-        # Display collision frequencies
-        if collision_detectors:
-            y_offset += 20
-            for i, detector in enumerate(collision_detectors):
-                freq_text = ui_font.render(f"Detector {i+1}: {detector.get_collisions_per_second():.1f} Hz", 
-                                         True, (255, 50, 50))
-                screen.blit(freq_text, (10, y_offset))
-                y_offset += 18
-        
-        # Display interference count
-        if interference_points:
-            constructive = sum(1 for p in interference_points if p.type == 'constructive')
-            destructive = sum(1 for p in interference_points if p.type == 'destructive')
-            interference_text = ui_font.render(f"Interference - Constructive: {constructive} | Destructive: {destructive}", 
-                                             True, (50, 50, 50))
-            screen.blit(interference_text, (10, y_offset))
-        
-        pygame.display.flip()
-        clock.tick(game_params['frame_rate'])
+        A point in the same merge cell as a live marker refreshes that marker
+        instead of stacking another on top of it. A refreshed marker counts
+        as new again, so the cap evicts markers in order of remaining life.
+        """
+        pool = self.marker_pool
+        cells = self.marker_cells
+        cell_size = INTERFERENCE_MERGE_CELL
+        refreshed = []
+        for x, y, is_constructive, strength in zip(xs.tolist(), ys.tolist(),
+                                                   constructive.tolist(), intensity.tolist()):
+            kind = 'constructive' if is_constructive else 'destructive'
+            cell = (int(x // cell_size), int(y // cell_size))
+            point = cells.get(cell)
+            if point is not None:
+                point.spawn(x, y, kind, max(point.intensity, strength))
+                refreshed.append(point)
+                continue
+            point = pool.acquire()
+            if point is None:
+                pool.renew(refreshed)
+                refreshed = []
+                self.forget_markers(pool.release_oldest(1))
+                point = pool.acquire()
+            point.spawn(x, y, kind, strength)
+            point.cell = cell
+            cells[cell] = point
+        pool.renew(refreshed)
+        
+        cap = self.max_interference_points
+        if cap is not None and len(pool) > cap:
+            self.forget_markers(pool.release_oldest(len(pool) - cap))
+    
+    def expire_marker(self, point):
+        """Age a marker one frame; True once it has expired"""
+        if point.update():
+            self.forget_markers((point,))
+            return True
+        return False
+    
+    def forget_markers(self, points):
+        cells = self.marker_cells
+        for point in points:
+            if cells.get(point.cell) is point:
+                del cells[point.cell]
+
+def draw_game(surface, core, dirty=None, blend=0.0):
+    """Render a GameCore, optionally tracking what was drawn in a DirtyRects.
+
+    blend (0-1) is how far the clock has got from the core's last tick to
+    its next one; circles and markers are drawn that far along.
+    """
+    if dirty is None:
+        surface.fill(BACKGROUND_COLOR)
+    else:
+        dirty.erase()
+    drawn = []
+    ui_font = app.font(UI_FONT_SIZE)
+    
+    # Draw circles and interference points through the shared alpha layer
+    alpha_layer = get_alpha_layer(surface.get_size())
+    alpha_layer.begin(surface)
+    for circle in core.circles:
+        circle.draw(alpha_layer, blend, core.circle_min_alpha)
+    
+    for point in core.interference_points:
+        point.draw(alpha_layer, blend, core.marker_alpha_step)
+    alpha_layer.flush()
+    
+    # Draw collision detectors
+    for detector in core.collision_detectors:
+        drawn.append(detector.draw(surface))
+    
+    # Draw cutting triangle
+    if core.show_cutting_effect:
+        intensity = min(1.0, math.sqrt(core.mouse_speed_squared) / (core.params['speed_threshold'] * 3))
+        draw_cutting_triangle(alpha_layer, core.mouse_pos[0], core.mouse_pos[1], 
+                            core.mouse_dx, core.mouse_dy, intensity)
+        alpha_layer.flush()
+    
+    # Draw UI
+    y_offset = 10
+    ui_text = text_cache.render(ui_font, "ESC: Menu | Left: Spawn | Right: Detector | F3: Profiler | F5: Save inputs", True, (100, 100, 100))
+    drawn.append(surface.blit(ui_text, (10, y_offset)))
+    
+    # Display collision frequencies
+    if core.collision_detectors:
+        y_offset += 20
+        for i, detector in enumerate(core.collision_detectors):
+            freq_text = text_cache.render(ui_font, f"Detector {i+1}: {detector.get_collisions_per_second():.1f} Hz", 
+                                          True, (255, 50, 50))
+            drawn.append(surface.blit(freq_text, (10, y_offset)))
+            y_offset += 18
+    
+    # Display interference count
+    if core.interference_points:
+        constructive = sum(1 for p in core.interference_points if p.type == 'constructive')
+        destructive = sum(1 for p in core.interference_points if p.type == 'destructive')
+        interference_text = text_cache.render(ui_font, f"Interference - Constructive: {constructive} | Destructive: {destructive}", 
+                                              True, (50, 50, 50))
+        drawn.append(surface.blit(interference_text, (10, y_offset)))
+    
+    # Display the quality tier
+    quality_text = text_cache.render(ui_font, f"Quality: {core.quality_name}", True, (100, 100, 100))
+    drawn.append(surface.blit(quality_text, (10, SCREEN_SIZE[1] - 20)))
+    
+    if dirty is not None:
+        dirty.add_all(alpha_layer.drawn_rects)
+        dirty.add_all(drawn)
+
+def run_game():
+    screen = app.screen
+    clock = app.clock
+    ui_font = app.font(UI_FONT_SIZE)
+    core = GameCore()
+    profiler = FrameProfiler(["idle", "events", "update_circles", "detectors", "interference", "draw", "flip"],
+                             RENDER_FPS or core.params['frame_rate'])
+    core.profiler = profiler
+    quality = QualityGovernor(QUALITY_TIERS, RENDER_FPS or core.params['frame_rate'], adaptive=ADAPTIVE_QUALITY)
+    background = pygame.Surface(SCREEN_SIZE).convert()
+    background.fill(BACKGROUND_COLOR)
+    dirty = DirtyRects(screen, background, DIRTY_RECT_UPDATES)
+    mouse_tracker = MouseTracker()
+    recorder = InputRecorder('game', {'game_params': dict(core.params)}) if RECORD_INPUTS else None
+    history = StateHistory(core, core.params['frame_rate'], QUALITY_TIERS) if STATE_HISTORY else None
+    accumulator = 0.0
+    pending_events = []
+    clock.tick()  # Don't count the time spent in the menu
+    
+    running = True
+    while running:
+        profiler.begin_frame()
+        frame_ms = clock.tick(RENDER_FPS)
+        accumulator += frame_ms / 1000.0  # Real time since last frame
+        profiler.mark("idle")
+        quality.begin_work()
+        
+        # Handle events
+        events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                dirty.invalidate()
+            elif event.type == pygame.KEYDOWN:
+                if profiler.handle_key(event.key):
+                    continue
+                if event.key == pygame.K_ESCAPE:
+                    return True
+                if event.key == pygame.K_F5 and recorder is not None:
+                    print(f"Input recording written to {recorder.save_timestamped()}")
+                elif event.key == pygame.K_p and history is not None:
+                    # Resuming drops whatever came after the tick scrubbed to
+                    if history.paused:
+                        history.resume()
+                        core.apply_quality(quality.settings)
+                        if recorder is not None:
+                            recorder.truncate(history.end)
+                    else:
+                        history.pause()
+                    accumulator = 0.0
+        pending_events.extend(events)
+        mouse_pos = pygame.mouse.get_pos()
+        mouse_velocity = mouse_tracker.feed(events, mouse_pos)
+        if recorder is not None:
+            recorder.begin_frame(frame_ms)
+        profiler.mark("events")
+        
+        # Simulate in fixed ticks, however long the frame took; presses go
+        # to the first tick. While paused only the arrow keys move it
+        dt = core.fixed_dt
+        ticks = 0
+        if history is not None and history.paused:
+            history.scrub_keys()
+            pending_events = []
+            accumulator = 0.0
+        while accumulator >= dt and ticks < MAX_TICKS_PER_FRAME:
+            input_state = InputState.from_events(pending_events, mouse_pos, mouse_velocity)
+            if history is not None:
+                history.step(input_state, dt, quality.tier)
+            else:
+                core.step(dt, input_state)
+            if recorder is not None:
+                recorder.record(input_state, dt, quality.tier)
+            pending_events = []
+            accumulator -= dt
+            ticks += 1
+        if ticks == MAX_TICKS_PER_FRAME:
+            accumulator = 0.0  # Too far behind; drop the backlog
+        
+        # Draw everything, part of the way to the next tick
+        draw_game(screen, core, dirty, accumulator / dt)
+        if history is not None and history.paused:
+            status = text_cache.render(ui_font, history.status(), True, (100, 100, 100))
+            dirty.add(screen.blit(status, (10, SCREEN_SIZE[1] - 40)))
+        dirty.add(profiler.draw_overlay(screen, ui_font, (SCREEN_SIZE[0], 0)))
+        profiler.mark("draw")
+        dirty.present()
+        profiler.mark("flip")
+        profiler.end_frame()
+        if quality.end_work():
+            core.apply_quality(quality.settings)
     
     return False
 
 # Main program loop
-while True:
-    run_menu()
-    should_continue = run_game()
-    if not should_continue:
-        break
-
-pygame.quit()
-sys.exit()
\ No newline at end of file
+if __name__ == "__main__":
+    while True:
+        run_menu()
+        should_continue = run_game()
+        if not should_continue:
+            break
+    
+    pygame.quit()
+    sys.exit()
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Mixing bus: many Doppler-shifted voices summed into one stereo stream.
+
+Each voice is a sine at its source's observed frequency with a left and
+right gain. render() synthesises every audible voice for a block as one
+(voices, frames) array and mixes it down with two matrix products, so the
+result can go out through a single AudioStream channel however many
+sources there are. Pitch and gains glide linearly across each block.
+"""
+import math
+import threading
+
+import numpy as np
+
+MIX_MAX_VOICES = 256  # loudest voices rendered per block; the rest are silent
+MIX_REFERENCE_DISTANCE = 600  # px; closer sources play at full gain
+MIX_PAN_WIDTH = 500  # px of horizontal offset for a hard left or right pan
+
+
+def voice_gains(offsets_x, distances, reference_distance=MIX_REFERENCE_DISTANCE, pan_width=MIX_PAN_WIDTH):
+    """(V, 2) left/right gains from each source's position relative to the listener.
+
+    Inverse-distance attenuation beyond reference_distance, equal-power
+    pan from the horizontal offset, and the whole set scaled down when the
+    voices would add up to more than full scale.
+    """
+    offsets_x = np.asarray(offsets_x, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    gain = reference_distance / np.maximum(distances, reference_distance)
+    total = gain.sum()
+    if total > 1.0:
+        gain /= total
+
+    # -1 is hard left, +1 hard right; cos/sin keeps the power constant
+    angle = (np.clip(offsets_x / pan_width, -1.0, 1.0) + 1.0) * (math.pi / 4)
+    return np.column_stack((gain * np.cos(angle), gain * np.sin(angle)))
+
+
+class MixingBus:
+    """Voice bank rendered in blocks; set_voices() may be called from any thread"""
+
+    def __init__(self, sample_rate, max_voices=MIX_MAX_VOICES, amplitude=0.3):
+        self.sample_rate = sample_rate
+        self.max_voices = max_voices
+        self.amplitude = amplitude
+
+        # Voice state, touched only by render()
+        self.frequency = np.zeros(0)
+        self.phase = np.zeros(0)
+        self.gain = np.zeros((0, 2))
+        self.active_voices = 0
+        self._ramps = {}  # frames -> (n, glide, ramp), reused every block
+
+        # Latest targets from set_voices(), picked up by the next block
+        self._lock = threading.Lock()
+        self._target_frequency = np.zeros(0)
+        self._target_gain = np.zeros((0, 2))
+
+    def set_voices(self, frequencies, gains):
+        """Targets for the next block: (V,) frequencies and (V, 2) gains.
+
+        Voice k stays voice k between calls, so keep sources in a stable
+        order; new voices fade in from silence.
+        """
+        frequencies = np.array(frequencies, dtype=float)
+        gains = np.array(gains, dtype=float).reshape(-1, 2)
+        with self._lock:
+            self._target_frequency = frequencies
+            self._target_gain = gains
+
+    def _resize(self, target_frequency):
+        """Match the voice state to the targets render() took under the lock"""
+        voices = len(target_frequency)
+        kept = min(voices, len(self.phase))
+        frequency = target_frequency.copy()
+        frequency[:kept] = self.frequency[:kept]
+        phase = np.zeros(voices)
+        phase[:kept] = self.phase[:kept]
+        gain = np.zeros((voices, 2))
+        gain[:kept] = self.gain[:kept]
+        self.frequency, self.phase, self.gain = frequency, phase, gain
+
+    def render(self, frames):
+        """Mix one int16 stereo block of all audible voices"""
+        with self._lock:
+            target_frequency = self._target_frequency
+            target_gain = self._target_gain
+        if len(target_frequency) != len(self.phase):
+            self._resize(target_frequency)
+
+        # Voice stealing: only the loudest max_voices are synthesised
+        loudness = target_gain.sum(axis=1) + self.gain.sum(axis=1)
+        if len(loudness) > self.max_voices:
+            active = np.argpartition(-loudness, self.max_voices)[:self.max_voices]
+        else:
+            active = np.flatnonzero(loudness > 0)
+        self.active_voices = len(active)
+        if not len(active):
+            self.frequency = target_frequency.copy()
+            self.gain = np.zeros_like(target_gain)
+            return np.zeros((frames, 2), dtype=np.int16)
+
+        ramps = self._ramps.get(frames)
+        if ramps is None:
+            n = np.arange(1, frames + 1)
+            ramps = self._ramps[frames] = (n, n * (n + 1) / (2.0 * frames), (n / frames).astype(np.float32))
+        n, glide, ramp = ramps
+
+        # Closed-form phase of a linear glide: sum of f0 + (f1 - f0) k / frames.
+        # Phases stay float64; the sines and the mix are float32, which is
+        # far below int16 resolution and about twice as fast
+        f0 = self.frequency[active]
+        f1 = target_frequency[active]
+        step = 2 * np.pi / self.sample_rate
+        phases = np.outer(f0 * step, n)
+        phases += np.outer((f1 - f0) * step, glide)
+        phases += self.phase[active, np.newaxis]
+        waves = np.sin(phases.astype(np.float32))
+
+        # Gains ramp across the block too: g0 + (g1 - g0) k / frames
+        g0 = self.gain[active]
+        g1 = target_gain[active]
+        mix = g0.T.astype(np.float32) @ waves
+        mix += ramp * ((g1 - g0).T.astype(np.float32) @ waves)
+
+        self.phase[active] = phases[:, -1] % (2 * np.pi)
+        self.frequency = target_frequency.copy()
+        gain = np.zeros_like(target_gain)
+        gain[active] = g1
+        self.gain = gain
+
+        mix *= self.amplitude * 32767
+        np.clip(mix, -32767, 32767, out=mix)
+        return mix.T.astype(np.int16, order="C")
@@ -0,0 +1,89 @@
+"""Preallocated, fixed-capacity pools of reusable objects.
+
+The game's circles and interference markers come and go every few frames.
+Allocating a new object for each one, and a new list each time the
+expired ones are filtered out, keeps the garbage collector busy during
+long sessions. A pool builds all its objects up front, hands them out
+through acquire() and takes expired ones back on a free list, so a
+session never holds more than capacity of them.
+"""
+
+
+class ObjectPool:
+    """capacity objects made by factory, split between a free list and
+    live, the objects in use in the order they were acquired.
+
+    live is a plain list that is only ever changed in place, so callers
+    may keep a reference to it.
+    """
+
+    def __init__(self, factory, capacity):
+        self.factory = factory
+        self.capacity = capacity
+        self.free = [factory() for _ in range(capacity)]
+        self.unbuilt = 0  # objects still owed to free, made on demand
+        self.live = []
+        self.refused = 0  # acquire() calls turned away at the cap
+
+    def __len__(self):
+        return len(self.live)
+
+    def __iter__(self):
+        return iter(self.live)
+
+    def acquire(self):
+        """A free object, now live, or None when all capacity are in use"""
+        if self.free:
+            obj = self.free.pop()
+        elif self.unbuilt:
+            self.unbuilt -= 1
+            obj = self.factory()
+        else:
+            self.refused += 1
+            return None
+        self.live.append(obj)
+        return obj
+
+    def sweep(self, expired):
+        """Recycle every live object for which expired(obj) is true,
+        keeping the rest in order; expired may update the object as well"""
+        live = self.live
+        kept = 0
+        for obj in live:
+            if expired(obj):
+                self.free.append(obj)
+            else:
+                live[kept] = obj
+                kept += 1
+        del live[kept:]
+
+    def renew(self, objs):
+        """Move live objs to the newest end, in the order given, as when
+        they have been started afresh; one pass however many there are"""
+        renewed = list(dict.fromkeys(objs))
+        if not renewed:
+            return
+        ids = {id(obj) for obj in renewed}
+        live = self.live
+        live[:] = [obj for obj in live if id(obj) not in ids] + renewed
+
+    def release_oldest(self, count):
+        """Recycle the count longest-lived objects; returns them"""
+        released = self.live[:count]
+        del self.live[:count]
+        self.free.extend(released)
+        return released
+
+    def clear(self):
+        self.free.extend(self.live)
+        self.live.clear()
+
+    def __getstate__(self):
+        # Free objects carry nothing worth keeping, so pickled pools (the
+        # history keyframes) hold only the live ones. An unpickled pool
+        # makes its free objects as acquire() asks for them, which keeps
+        # restoring a keyframe cheap
+        state = self.__dict__.copy()
+        state["unbuilt"] += len(self.free)
+        state["free"] = []
+        return state
@@ -0,0 +1,183 @@
+"""Render either app offline to numbered PNG frames, plus a WAV for the Doppler demo.
+
+    python offline_render.py doppler --seconds 60 --path circle --out render
+    python offline_render.py game --seconds 20 --path held --out render
+    python offline_render.py doppler --input inputs.json --out render
+    python offline_render.py game --input dopple_input_20240101_120000.npz --out render
+
+Input is a scripted cursor path, a file written by sim_input.save_inputs
+or an input recording saved with F5 (recording.py).
+The simulations are deterministic, so every pool worker steps its own core
+up to the end of its slice of frames and rasterizes only that slice, while
+the main process synthesises the audio through the same mixing bus the
+live demo streams. The game has no audio and only gets frames.
+"""
+import argparse
+import itertools
+import os
+import time
+import wave
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from app_context import spawn_context  # noqa: E402
+from recording import Recording, open_inputs  # noqa: E402
+from sim_input import circle_path, straight_pass, sweep_path  # noqa: E402
+
+SLICES_PER_WORKER = 2  # smaller slices balance better but re-step more
+
+
+def scripted_inputs(app, path, steps):
+    if app == "doppler":
+        import DOPPLE_EFFECT
+        w, h = DOPPLE_EFFECT.WIDTH, DOPPLE_EFFECT.HEIGHT
+        paths = {
+            "circle": lambda: circle_path(steps, (w // 2, h // 2), 250, 480),
+            "sweep": lambda: sweep_path(steps, h // 2, 100, w - 250, 240),
+            "supersonic": lambda: straight_pass(steps, h // 3, 0, w, 8),
+        }
+    else:
+        import mainWindow
+        w, h = mainWindow.SCREEN_SIZE
+        paths = {
+            "circle": lambda: circle_path(steps, (w // 2, h // 2), 150, 90, hold_button=1),
+            "sweep": lambda: sweep_path(steps, h // 2, 50, w - 50, 120, hold_button=1),
+            "held": lambda: circle_path(steps, (w // 2, h // 2), 20, 400, hold_button=1),
+        }
+    return paths[path]()
+
+
+def input_stream(app, path, input_file, steps):
+    """The first steps input states, from the recording or the script"""
+    if input_file:
+        return itertools.islice(open_inputs(input_file), steps)
+    return scripted_inputs(app, path, steps)
+
+
+def recorded_game(input_file):
+    """For a game recording, restore its game_params; returns its quality
+    tier per step, or None for other inputs"""
+    if not input_file or not input_file.endswith(".npz"):
+        return None
+    import mainWindow
+    recording = Recording(input_file)
+    mainWindow.game_params.update(recording.meta["game_params"])
+    return recording.quality.tolist()
+
+
+def frame_path(frames_dir, index):
+    return os.path.join(frames_dir, f"frame_{index:06d}.png")
+
+
+def render_slice(task):
+    """Pool worker: step from the start, save frames start..stop-1"""
+    app, path, input_file, start, stop, frames_dir = task
+    inputs = input_stream(app, path, input_file, stop)
+    if app == "doppler":
+        import DOPPLE_EFFECT
+        sim = DOPPLE_EFFECT.DopplerSimulation()
+        sim.dirty.enabled = False  # Every frame from a clean background
+        for index, input_state in enumerate(inputs):
+            sim.step(DOPPLE_EFFECT.FIXED_DT, input_state)
+            if index >= start:
+                sim.render_scene()
+                pygame.image.save(sim.screen, frame_path(frames_dir, index))
+    else:
+        import mainWindow
+        tiers = recorded_game(input_file)
+        core = mainWindow.GameCore()
+        surface = pygame.Surface(mainWindow.SCREEN_SIZE)
+        for index, input_state in enumerate(inputs):
+            if tiers is not None:
+                settings = mainWindow.QUALITY_TIERS[tiers[index]]
+                if settings['name'] != core.quality_name:
+                    core.apply_quality(settings)
+            core.step(core.fixed_dt, input_state)
+            if index >= start:
+                mainWindow.draw_game(surface, core)
+                pygame.image.save(surface, frame_path(frames_dir, index))
+    return stop - start
+
+
+def render_audio(path, input_file, steps, wav_path):
+    """Doppler audio, one mixing-bus block per simulation step"""
+    import DOPPLE_EFFECT
+
+    core = DOPPLE_EFFECT.DopplerCore()
+    generator = DOPPLE_EFFECT.SoundGenerator(streaming=True)
+    block_frames = round(generator.sample_rate * DOPPLE_EFFECT.FIXED_DT)
+    with wave.open(wav_path, "wb") as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(generator.sample_rate)
+        for input_state in input_stream("doppler", path, input_file, steps):
+            core.step(DOPPLE_EFFECT.FIXED_DT, input_state)
+            generator.update_voices(*core.voice_geometry())
+            out.writeframes(generator.bus.render(block_frames).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("app", choices=("doppler", "game"))
+    parser.add_argument("--path", default="circle", help="scripted cursor path (circle, sweep, supersonic, held)")
+    parser.add_argument("--input", help="recorded input file instead of a scripted path")
+    parser.add_argument("--seconds", type=float, help="clip length (default 10, or the whole recording)")
+    parser.add_argument("--out", default="render", help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--no-frames", action="store_true")
+    parser.add_argument("--no-audio", action="store_true")
+    args = parser.parse_args()
+
+    if args.app == "doppler":
+        import DOPPLE_EFFECT
+        fps = DOPPLE_EFFECT.FPS
+    else:
+        import mainWindow
+        recorded_game(args.input)
+        fps = mainWindow.game_params['frame_rate']
+    if args.input:
+        steps = len(open_inputs(args.input))
+        if args.seconds is not None:
+            steps = min(steps, round(args.seconds * fps))
+    else:
+        steps = round((10 if args.seconds is None else args.seconds) * fps)
+
+    frames_dir = os.path.join(args.out, "frames")
+    os.makedirs(frames_dir, exist_ok=True)
+    start_time = time.perf_counter()
+
+    # Contiguous slices; each worker pays for re-stepping up to its slice,
+    # which is cheap next to rasterizing and PNG encoding
+    workers = max(1, args.workers)
+    slices = workers * SLICES_PER_WORKER
+    bounds = [steps * k // slices for k in range(slices + 1)]
+    tasks = [(args.app, args.path, args.input, start, stop, frames_dir)
+             for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+    # Leaving the with block terminates the pool, so a worker still busy
+    # after an error elsewhere is stopped rather than waited for
+    with spawn_context().Pool(workers) as pool:
+        pending = None if args.no_frames else pool.map_async(render_slice, tasks)
+        wav_path = None
+        if args.app == "doppler" and not args.no_audio:
+            wav_path = os.path.join(args.out, "audio.wav")
+            render_audio(args.path, args.input, steps, wav_path)
+        frames = sum(pending.get()) if pending is not None else 0
+        pool.close()
+        pool.join()
+
+    elapsed = time.perf_counter() - start_time
+    clip_seconds = steps / fps
+    print(f"{steps} steps ({clip_seconds:.1f} s at {fps} fps) rendered in {elapsed:.1f} s "
+          f"({clip_seconds / elapsed:.1f}x real time) with {workers} workers")
+    if frames:
+        print(f"  {frames} frames in {frames_dir}")
+    if wav_path:
+        print(f"  audio in {wav_path}")
+
+
+if __name__ == "__main__":
+    main()
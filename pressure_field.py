@@ -0,0 +1,217 @@
+"""Acoustic pressure field of a moving point source, drawn as a heatmap.
+
+The source's past positions are kept in a SourceHistory. Sound reaching
+grid point p at time t left the source at the retarded time tau where
+
+    t - tau = |p - s(tau)| / c
+
+which is solved for every grid point at once by Newton iteration,
+starting from the source's current position and falling back to
+bisection when a step overshoots. The history is sampled once per
+simulation step, so the source position at any tau is a linear
+interpolation by index, and the slope of that segment is the source
+velocity the Newton step needs. A subsonic source has exactly one root,
+found to well under a pixel; inside a supersonic source's cone there are
+several and the field shows the one the iteration lands on.
+
+The pressure is the source's own sinusoid evaluated at tau, falling off
+with distance, so wavefronts bunch up ahead of a moving source and
+spread out behind it. Points with no root (sound that has not arrived)
+are left silent.
+
+The field is computed on a coarse grid, in tiles on a thread pool (NumPy
+releases the GIL in the array loops), written through
+pygame.surfarray.pixels3d into a small surface and scaled up onto the
+screen.
+"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pygame
+
+FIELD_GRID_SIZE = (250, 150)  # grid columns x rows
+FIELD_WAVE_FREQUENCY = 4.0  # Hz; the visual pitch of the field
+FIELD_NEAR_DISTANCE = 60.0  # px; closer than this the amplitude stops growing
+FIELD_ITERATIONS = 6  # Newton or bisection rounds for the retarded time
+
+
+class SourceHistory:
+    """Ring buffer of (t, x, y) source samples, oldest first, evenly
+    spaced in time as fixed simulation steps are.
+
+    Every sample is written twice, at slot and slot + capacity, so the
+    live samples are always one contiguous slice and window() can hand
+    them to np.interp without unrolling the ring.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.t = np.zeros(2 * capacity)
+        self.x = np.zeros(2 * capacity)
+        self.y = np.zeros(2 * capacity)
+        self.next_slot = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, t, x, y):
+        """Record the source at time t (seconds, increasing)"""
+        for slot in (self.next_slot, self.next_slot + self.capacity):
+            self.t[slot] = t
+            self.x[slot] = x
+            self.y[slot] = y
+        self.next_slot = (self.next_slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        self.next_slot = 0
+        self.count = 0
+
+    def window(self):
+        """(t, x, y) views of the live samples, oldest first"""
+        end = self.next_slot + self.capacity
+        live = slice(end - self.count, end)
+        return self.t[live], self.x[live], self.y[live]
+
+
+def field_palette(background, compression, rarefaction, levels=256):
+    """(levels, 3) uint8 colours from rarefaction through background to compression"""
+    level = np.linspace(-1.0, 1.0, levels)[:, np.newaxis]
+    background = np.asarray(background, dtype=float)
+    toward = np.where(level > 0, np.asarray(compression, dtype=float), np.asarray(rarefaction, dtype=float))
+    return (background + np.abs(level) * (toward - background)).round().astype(np.uint8)
+
+
+class PressureField:
+    """Heatmap renderer for a SourceHistory.
+
+    render(surface, t, history) draws the field at time t over the whole
+    of surface. Grid points no recorded sound has reached are silent, so
+    the field fills in outwards as the history starts.
+    """
+
+    def __init__(self, screen_size, sound_speed, palette, grid_size=FIELD_GRID_SIZE,
+                 wave_frequency=FIELD_WAVE_FREQUENCY, near_distance=FIELD_NEAR_DISTANCE,
+                 iterations=FIELD_ITERATIONS, workers=None):
+        self.screen_size = screen_size
+        self.sound_speed = sound_speed
+        self.palette = palette
+        self.grid_size = grid_size
+        self.omega = 2 * math.pi * wave_frequency
+        self.near_distance = near_distance
+        self.iterations = iterations
+        self.surface = pygame.Surface(grid_size)
+
+        # Grid point centres in screen pixels, in surfarray (column, row) order
+        columns, rows = grid_size
+        cell_x = screen_size[0] / columns
+        cell_y = screen_size[1] / rows
+        self.grid_x = np.repeat(((np.arange(columns) + 0.5) * cell_x)[:, np.newaxis], rows, axis=1)
+        self.grid_y = np.repeat(((np.arange(rows) + 0.5) * cell_y)[np.newaxis, :], columns, axis=0)
+        self.levels = np.empty(grid_size, dtype=np.intp)
+        self.tolerance = max(cell_x, cell_y) / sound_speed  # a cell of travel, in seconds
+
+        # Column bands, one task each; a single band runs inline
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        bounds = [columns * k // self.workers for k in range(self.workers + 1)]
+        self.tiles = [slice(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+        self.executor = ThreadPoolExecutor(self.workers) if len(self.tiles) > 1 else None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def retarded_time(self, px, py, t, history_t, history_x, history_y):
+        """Emission time of the sound at points (px, py) at time t, the
+        distance it travelled, and how far from a root it ended up, in
+        seconds. Points no recorded sound has reached never get close."""
+        c = self.sound_speed
+        samples = len(history_t)
+        start = history_t[0]
+        rate = (samples - 1) / (history_t[-1] - start) if samples > 1 else 0.0
+        step_x = np.diff(history_x) if samples > 1 else np.zeros(1)
+        step_y = np.diff(history_y) if samples > 1 else np.zeros(1)
+
+        # The residual t - tau - |p - s(tau)| / c is never positive at tau = t
+        # and, for a subsonic source, falls steadily from the oldest sample,
+        # so [low, high] brackets the root wherever the sound has arrived
+        low = np.full(px.shape, start)
+        high = np.full(px.shape, t)
+        dx = px - history_x[-1]
+        dy = py - history_y[-1]
+        distance = np.hypot(dx, dy)
+        tau = np.clip(t - distance / c, start, t)  # Sound from where the source is now
+        residual = np.empty(px.shape)
+        position = np.empty(px.shape)
+        for _ in range(self.iterations):
+            # Linear interpolation between the evenly spaced samples; the
+            # segment's step is also the source velocity at tau
+            np.subtract(tau, start, out=position)
+            position *= rate
+            np.clip(position, 0, max(samples - 1, 0), out=position)
+            index = np.minimum(position.astype(np.intp), max(samples - 2, 0))
+            position -= index
+            segment_x = step_x[index]
+            segment_y = step_y[index]
+            np.subtract(px, history_x[index], out=dx)
+            dx -= position * segment_x
+            np.subtract(py, history_y[index], out=dy)
+            dy -= position * segment_y
+            np.hypot(dx, dy, out=distance)
+
+            np.subtract(t, tau, out=residual)
+            residual -= distance / c
+            ahead = residual > 0
+            np.copyto(low, tau, where=ahead)
+            np.copyto(high, tau, where=~ahead)
+
+            # Newton step; the residual falls with slope 1 - v . u / c. Steps
+            # that leave the bracket, as near a supersonic source, bisect instead
+            segment_x *= dx
+            segment_y *= dy
+            segment_x += segment_y
+            segment_x *= rate / c
+            segment_x /= np.maximum(distance, 1e-9)
+            np.subtract(1.0, segment_x, out=segment_x)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tau += residual / segment_x
+            bisect = ~((tau >= low) & (tau <= high))
+            np.copyto(tau, (low + high) * 0.5, where=bisect)
+        return tau, distance, np.abs(residual, out=residual)
+
+    def _render_tile(self, tile, t, history):
+        tau, distance, error = self.retarded_time(self.grid_x[tile], self.grid_y[tile], t, *history)
+
+        # The source's own sinusoid at the emission time, spread over distance
+        pressure = np.sin(self.omega * tau)
+        pressure *= self.near_distance / np.maximum(distance, self.near_distance)
+        # Not reached yet, or not converged
+        pressure[error > self.tolerance] = 0.0
+
+        levels = self.levels[tile]
+        scale = (len(self.palette) - 1) / 2
+        np.rint((pressure + 1.0) * scale, out=pressure)
+        levels[...] = pressure
+
+    def render(self, surface, t, history):
+        """Draw the field at time t (seconds) over all of surface, which
+        should be screen_size; returns the rect drawn"""
+        if not len(history):
+            surface.fill(self.palette[len(self.palette) // 2])
+            return surface.get_rect()
+
+        window = history.window()
+        if self.executor is None:
+            self._render_tile(self.tiles[0], t, window)
+        else:
+            list(self.executor.map(lambda tile: self._render_tile(tile, t, window), self.tiles))
+
+        # Straight into the grid surface's pixels, then one scale to the screen
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        np.take(self.palette, self.levels, axis=0, out=pixels)
+        del pixels  # unlock before scaling
+        return pygame.transform.smoothscale(self.surface, surface.get_size(), surface).get_rect()
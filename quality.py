@@ -0,0 +1,101 @@
+"""Adaptive quality: trade detail for frame time when a frame runs over budget.
+
+Each app lists its quality tiers, best first, as dicts of settings. The
+loop times the work of every frame (everything but the clock's sleep) and
+hands it to QualityGovernor.update(). A run of frames over the frame
+budget steps down one tier; a longer run of frames with plenty of
+headroom steps back up. The two runs differ in length so the tier does
+not flap between two neighbours that sit either side of the budget.
+
+    governor = QualityGovernor(TIERS, FPS)
+    ...
+    if governor.update(work_ms):
+        apply(governor.settings)
+"""
+import time
+
+QUALITY_HEADROOM = 0.6  # step up only when frames use less than this share of the budget
+QUALITY_DOWN_FRAMES = 8  # over-budget frames in a row before stepping down
+QUALITY_UP_FRAMES = 90  # frames with headroom in a row before stepping up
+
+
+class QualityGovernor:
+    """Picks a tier from the recent frame times.
+
+    tier is the index into tiers (0 is full quality) and settings that
+    tier's dict. tier_frames counts the frames spent in each tier, for
+    benchmarks. With adaptive off the governor still counts and still
+    reports the tier it would pick in wanted_tier, but never changes tier.
+    """
+
+    def __init__(self, tiers, target_fps, headroom=QUALITY_HEADROOM,
+                 down_frames=QUALITY_DOWN_FRAMES, up_frames=QUALITY_UP_FRAMES, adaptive=True):
+        self.tiers = list(tiers)
+        self.budget_ms = 1000.0 / target_fps
+        self.headroom = headroom
+        self.down_frames = down_frames
+        self.up_frames = up_frames
+        self.adaptive = adaptive
+        self.tier = 0
+        self.wanted_tier = 0
+        self.tier_frames = [0] * len(self.tiers)
+        self.changes = 0
+        self._over = 0
+        self._under = 0
+        self._work_start = None
+
+    @property
+    def settings(self):
+        return self.tiers[self.tier]
+
+    @property
+    def name(self):
+        return self.settings["name"]
+
+    def begin_work(self):
+        """Mark the start of a frame's work, after the clock's sleep"""
+        self._work_start = time.perf_counter()
+
+    def end_work(self):
+        """Close the frame begun with begin_work(); returns True if the tier changed"""
+        if self._work_start is None:
+            return False
+        work_ms = (time.perf_counter() - self._work_start) * 1000.0
+        self._work_start = None
+        return self.update(work_ms)
+
+    def update(self, work_ms):
+        """Record one frame's work time; returns True if the tier changed"""
+        self.tier_frames[self.tier] += 1
+        if work_ms > self.budget_ms:
+            self._over += 1
+            self._under = 0
+        elif work_ms < self.budget_ms * self.headroom:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        wanted = self.wanted_tier
+        if self._over >= self.down_frames and wanted < len(self.tiers) - 1:
+            wanted += 1
+            self._over = 0
+        elif self._under >= self.up_frames and wanted > 0:
+            wanted -= 1
+            self._under = 0
+        self.wanted_tier = wanted
+
+        if not self.adaptive or wanted == self.tier:
+            return False
+        self.tier = wanted
+        self.changes += 1
+        return True
+
+    def summary(self):
+        """Tier names with their frame counts, for benchmark results"""
+        return {
+            "tier": self.name,
+            "wanted_tier": self.tiers[self.wanted_tier]["name"],
+            "changes": self.changes,
+            "tier_frames": {tier["name"]: count for tier, count in zip(self.tiers, self.tier_frames)},
+        }
@@ -0,0 +1,162 @@
+"""Compact input recordings of live sessions, and their replay.
+
+Both app loops feed every simulation step they run to an InputRecorder:
+the step's InputState, its dt, the frame it ran in and, for the game,
+the quality tier (which changes how often interference is detected, so
+it is part of the simulation). Steps go into a preallocated NumPy record
+array, so recording a step costs one row assignment; presses and key
+codes, which are rare, go into a separate event list.
+
+save() writes the columns to a compressed .npz:
+
+    step_frame  u4   frame the step ran in
+    step_dt     f8   seconds the step advanced the simulation
+    mouse       i4   (steps, 2) cursor position
+    velocity    f8   (steps, 2) filtered cursor velocity, NaN if none
+    quality     u1   quality tier index
+    frame_ms    f8   real time between frames, one per frame
+    event_step  u4   step each press belongs to, in order
+    event_kind  u1   0 button down, 1 button up, 2 key down
+    event_code  i4   button number or key code
+    meta        JSON app name and (for the game) game_params
+
+Replaying the steps into a fresh core reproduces the live simulation bit
+for bit, with no window and as fast as the core runs:
+
+    python headless.py doppler --replay dopple_input_20240101_120000.npz
+"""
+import json
+import time
+
+import numpy as np
+
+from sim_input import InputState, load_inputs
+
+RECORDING_CAPACITY = 4096  # initial steps; doubles when full
+
+STEP_DTYPE = np.dtype([("frame", "u4"), ("dt", "f8"), ("mouse", "i4", 2),
+                       ("velocity", "f8", 2), ("quality", "u1")])
+BUTTON_DOWN, BUTTON_UP, KEY_DOWN = 0, 1, 2
+
+
+class InputRecorder:
+    """Growing record of the steps of one session"""
+
+    def __init__(self, app, meta=None, capacity=RECORDING_CAPACITY):
+        self.app = app
+        self.meta = dict(meta or {})
+        self.steps = np.zeros(capacity, dtype=STEP_DTYPE)
+        self.frame_ms = np.zeros(capacity)
+        self.events = []  # (step, kind, code)
+        self.step_count = 0
+        self.frame_count = 0
+
+    def __len__(self):
+        return self.step_count
+
+    def begin_frame(self, frame_ms):
+        """Start a new frame that came frame_ms after the previous one"""
+        if self.frame_count == len(self.frame_ms):
+            self.frame_ms = np.concatenate((self.frame_ms, np.zeros(len(self.frame_ms))))
+        self.frame_ms[self.frame_count] = frame_ms
+        self.frame_count += 1
+
+    def record(self, input_state, dt, quality=0):
+        """Add one simulation step of the current frame"""
+        n = self.step_count
+        if n == len(self.steps):
+            self.steps = np.concatenate((self.steps, np.zeros(n, dtype=STEP_DTYPE)))
+        velocity = input_state.mouse_velocity
+        self.steps[n] = (self.frame_count - 1, dt, input_state.mouse_pos,
+                         (np.nan, np.nan) if velocity is None else velocity, quality)
+        if input_state.buttons_down or input_state.buttons_up or input_state.keys_down:
+            events = self.events
+            events.extend((n, BUTTON_DOWN, button) for button in input_state.buttons_down)
+            events.extend((n, BUTTON_UP, button) for button in input_state.buttons_up)
+            events.extend((n, KEY_DOWN, key) for key in input_state.keys_down)
+        self.step_count = n + 1
+
+    def truncate(self, steps):
+        """Forget every step from steps on, as when a paused session is
+        rewound and resumed"""
+        self.step_count = min(self.step_count, steps)
+        self.events = [event for event in self.events if event[0] < self.step_count]
+
+    def save(self, path):
+        steps = self.steps[:self.step_count]
+        events = np.array(self.events, dtype=np.int64).reshape(-1, 3)
+        meta = dict(self.meta, app=self.app)
+        np.savez_compressed(path, step_frame=steps["frame"], step_dt=steps["dt"],
+                            mouse=steps["mouse"], velocity=steps["velocity"],
+                            quality=steps["quality"], frame_ms=self.frame_ms[:self.frame_count],
+                            event_step=events[:, 0].astype(np.uint32),
+                            event_kind=events[:, 1].astype(np.uint8),
+                            event_code=events[:, 2].astype(np.int32),
+                            meta=np.array(json.dumps(meta)))
+
+    def save_timestamped(self):
+        """Save as dopple_input_<timestamp>.npz in the working directory; returns the path"""
+        path = time.strftime("dopple_input_%Y%m%d_%H%M%S.npz")
+        self.save(path)
+        return path
+
+
+class Recording:
+    """A saved InputRecorder, loaded for replay"""
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.columns = {name: data[name] for name in data.files if name != "meta"}
+            self.meta = json.loads(str(data["meta"]))
+        self.app = self.meta["app"]
+
+    def __len__(self):
+        return len(self.columns["step_dt"])
+
+    @property
+    def dt(self):
+        return self.columns["step_dt"]
+
+    @property
+    def quality(self):
+        return self.columns["quality"]
+
+    @property
+    def frame_ms(self):
+        return self.columns["frame_ms"]
+
+    def inputs(self):
+        """The InputState of every step, in order"""
+        columns = self.columns
+        pressed = {}
+        for step, kind, code in zip(columns["event_step"].tolist(), columns["event_kind"].tolist(),
+                                    columns["event_code"].tolist()):
+            pressed.setdefault(step, ([], [], []))[kind].append(code)
+        no_presses = ((), (), ())
+        for step, (mouse, velocity) in enumerate(zip(columns["mouse"].tolist(), columns["velocity"].tolist())):
+            buttons_down, buttons_up, keys_down = pressed.get(step, no_presses)
+            velocity = None if velocity[0] != velocity[0] else tuple(velocity)  # NaN: none recorded
+            yield InputState(tuple(mouse), buttons_down, buttons_up, keys_down, velocity)
+
+
+def replay(recording, core, quality_tiers=None):
+    """Step core through every recorded step as fast as possible; returns
+    steps run. Cores whose simulation depends on the quality tier (the
+    game) need their tiers, and the game's game_params must already match
+    recording.meta."""
+    tier = 0
+    steps = 0
+    for input_state, dt, quality in zip(recording.inputs(), recording.dt.tolist(), recording.quality.tolist()):
+        if quality_tiers is not None and quality != tier:
+            tier = quality
+            core.apply_quality(quality_tiers[tier])
+        core.step(dt, input_state)
+        steps += 1
+    return steps
+
+
+def open_inputs(path):
+    """Input states from a recording (.npz) or a save_inputs JSON file"""
+    if path.endswith(".npz"):
+        return list(Recording(path).inputs())
+    return load_inputs(path)
@@ -0,0 +1,104 @@
+"""Input snapshots for the simulation cores.
+
+Each core step takes an InputState instead of reading pygame directly, so
+the same core can be driven by live events, a script or a recording.
+"""
+import json
+import math
+
+import pygame
+
+
+class InputState:
+    """Everything one simulation step needs to know about the user"""
+    __slots__ = ['mouse_pos', 'buttons_down', 'buttons_up', 'keys_down', 'mouse_velocity']
+
+    def __init__(self, mouse_pos=(0, 0), buttons_down=(), buttons_up=(), keys_down=(), mouse_velocity=None):
+        self.mouse_pos = mouse_pos  # Cursor position for this step
+        self.buttons_down = tuple(buttons_down)  # Mouse buttons pressed this step
+        self.buttons_up = tuple(buttons_up)  # Mouse buttons released this step
+        self.keys_down = tuple(keys_down)  # Key codes pressed this step
+        # Filtered cursor velocity in px/s from input_filter.MouseTracker;
+        # None lets the core estimate it from the positions of its steps
+        self.mouse_velocity = mouse_velocity
+
+    def __repr__(self):
+        return (f"InputState(mouse_pos={self.mouse_pos}, buttons_down={self.buttons_down}, "
+                f"buttons_up={self.buttons_up}, keys_down={self.keys_down}, "
+                f"mouse_velocity={self.mouse_velocity})")
+
+    @classmethod
+    def from_events(cls, events, mouse_pos, mouse_velocity=None):
+        """Collect the input-related events of one frame"""
+        buttons_down = []
+        buttons_up = []
+        keys_down = []
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                buttons_down.append(event.button)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                buttons_up.append(event.button)
+            elif event.type == pygame.KEYDOWN:
+                keys_down.append(event.key)
+        return cls(mouse_pos, buttons_down, buttons_up, keys_down, mouse_velocity)
+
+
+def _hold(step, hold_button):
+    return (hold_button,) if hold_button and step == 0 else ()
+
+
+def circle_path(steps, center, radius, period_steps, hold_button=None):
+    """Scripted input: cursor going round a circle, optionally holding a button"""
+    for step in range(steps):
+        angle = 2 * math.pi * step / period_steps
+        pos = (int(center[0] + radius * math.cos(angle)), int(center[1] + radius * math.sin(angle)))
+        yield InputState(pos, _hold(step, hold_button))
+
+
+def sweep_path(steps, y, x_min, x_max, period_steps, hold_button=None):
+    """Scripted input: cursor sweeping left and right at constant speed"""
+    span = x_max - x_min
+    for step in range(steps):
+        phase = (step % period_steps) / period_steps
+        offset = span * (2 * phase if phase < 0.5 else 2 * (1 - phase))
+        yield InputState((int(x_min + offset), int(y)), _hold(step, hold_button))
+
+
+def straight_pass(steps, y, x_min, x_max, pixels_per_step, hold_button=None):
+    """Scripted input: repeated left-to-right passes at a fixed speed
+    (fast enough to outrun the simulated sound if pixels_per_step is large)"""
+    span = x_max - x_min
+    for step in range(steps):
+        yield InputState((int(x_min + (step * pixels_per_step) % span), int(y)), _hold(step, hold_button))
+
+
+def save_inputs(path, inputs):
+    """Write input states to a JSON file, one object per step"""
+    rows = []
+    for state in inputs:
+        row = {"mouse_pos": list(state.mouse_pos), "buttons_down": list(state.buttons_down),
+               "buttons_up": list(state.buttons_up), "keys_down": list(state.keys_down)}
+        if state.mouse_velocity is not None:
+            row["mouse_velocity"] = list(state.mouse_velocity)
+        rows.append(row)
+    with open(path, "w") as f:
+        json.dump(rows, f)
+
+
+def load_inputs(path):
+    """Input states saved by save_inputs"""
+    with open(path) as f:
+        rows = json.load(f)
+    return [InputState(tuple(row["mouse_pos"]), row.get("buttons_down", ()),
+                       row.get("buttons_up", ()), row.get("keys_down", ()),
+                       tuple(row["mouse_velocity"]) if "mouse_velocity" in row else None)
+            for row in rows]
+
+
+def run_headless(core, inputs, dt):
+    """Step a core through scripted inputs as fast as possible; returns steps run"""
+    steps = 0
+    for input_state in inputs:
+        core.step(dt, input_state)
+        steps += 1
+    return steps
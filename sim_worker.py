@@ -0,0 +1,266 @@
+"""Doppler physics and audio in a worker process.
+
+With DOPPLE_EFFECT.SIM_WORKER set, the window process only handles
+input and drawing. A SimWorker process owns a DopplerCore and the
+streamed SoundGenerator. It steps the core on its own fixed-step clock,
+feeds the mix, and publishes what the renderer needs through shared
+memory. A slow draw then no longer stalls the audio, and a slow step no
+longer stalls the picture.
+
+Neither side ever waits for the other:
+
+    main -> worker   input states and commands on a multiprocessing
+                     Queue; the main side only put_nowait()s, the worker
+                     drains it with get_nowait() between steps
+    worker -> main   a SharedState block guarded by a seqlock: the worker
+                     bumps the sequence number to odd, writes, bumps it to
+                     even; the reader copies and keeps the copy only if the
+                     number was even and unchanged. A read that keeps
+                     colliding with writes gives up and the frame reuses
+                     the previous snapshot.
+"""
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app_context import spawn_context
+
+SHARED_WAVES = 256  # newest waves published; far more than the wave lifetime allows by default
+SEQLOCK_RETRIES = 4  # reads that race a write before the frame reuses its last snapshot
+WORKER_STOP_TIMEOUT = 2.0  # seconds to wait for a clean exit before terminating
+
+# Scalar slots of the snapshot
+SCALARS = ("sim_time", "source_x", "source_y", "source_velocity_x", "source_velocity_y",
+           "observed_frequency", "observer_x", "observer_y")
+
+
+def snapshot_layout(max_emitters, max_observers, history_steps):
+    """(name, dtype, shape) of every array in the shared block; seq first"""
+    return [
+        ("seq", np.int64, (1,)),
+        ("scalars", np.float64, (len(SCALARS),)),
+        ("counts", np.int64, (4,)),  # waves, emitters, observers, history samples
+        ("wave_x", np.float64, (SHARED_WAVES,)),
+        ("wave_y", np.float64, (SHARED_WAVES,)),
+        ("wave_radius", np.float64, (SHARED_WAVES,)),
+        ("wave_alpha", np.float64, (SHARED_WAVES,)),
+        ("emitter_position", np.float64, (max_emitters, 2)),
+        ("emitter_rx", np.float64, (max_emitters,)),
+        ("observer_position", np.float64, (max_observers, 2)),
+        ("observer_rx", np.float64, (max_observers,)),
+        ("heard", np.float64, (max_observers + 1,)),
+        ("history_t", np.float64, (history_steps,)),
+        ("history_x", np.float64, (history_steps,)),
+        ("history_y", np.float64, (history_steps,)),
+    ]
+
+
+class SharedState:
+    """Named NumPy views over one shared-memory block, with a seqlock.
+
+    The creating side (name=None) owns the block and unlinks it on close.
+    """
+
+    def __init__(self, layout, name=None):
+        offsets = []
+        size = 0
+        for field, dtype, shape in layout:
+            size = -(-size // 8) * 8  # 8-byte alignment for every array
+            offsets.append(size)
+            size += np.dtype(dtype).itemsize * int(np.prod(shape))
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.arrays = {field: np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offset)
+                       for (field, dtype, shape), offset in zip(layout, offsets)}
+        self.seq = self.arrays["seq"]
+        if self.owner:
+            self.seq[0] = 0
+        self.last_seq = 0  # seq 0 is the empty block: nothing to read until the first publish()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def begin_write(self):
+        self.seq[0] += 1  # odd: a write is in progress
+
+    def end_write(self):
+        self.seq[0] += 1
+
+    def read(self):
+        """Copies of every array from a consistent snapshot, or None when
+        nothing new was published or every try raced a write"""
+        seq = self.seq
+        for _ in range(SEQLOCK_RETRIES):
+            start = int(seq[0])
+            if start == self.last_seq:
+                return None
+            if start & 1:
+                continue
+            copies = {field: array.copy() for field, array in self.arrays.items() if field != "seq"}
+            if int(seq[0]) == start:
+                self.last_seq = start
+                return copies
+        return None
+
+    def close(self):
+        self.arrays = self.seq = None  # drop the views before closing the buffer
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def publish(state, core):
+    """Write a DopplerCore's drawable state into the shared block"""
+    arrays = state.arrays
+    state.begin_write()
+    arrays["scalars"][:] = [getattr(core, name) for name in SCALARS]
+
+    waves = core.waves
+    idx = waves.live_indices()[-SHARED_WAVES:]
+    n = len(idx)
+    arrays["wave_x"][:n] = waves.center_x[idx]
+    arrays["wave_y"][:n] = waves.center_y[idx]
+    arrays["wave_radius"][:n] = waves.radius[len(waves.radius) - n:]
+    arrays["wave_alpha"][:n] = waves.alpha[len(waves.alpha) - n:]
+
+    emitters, observers = core.emitters, core.observers
+    arrays["emitter_position"][:len(emitters)] = emitters.position
+    arrays["emitter_rx"][:len(emitters)] = emitters.rx
+    arrays["observer_position"][:len(observers)] = observers.position
+    arrays["observer_rx"][:len(observers)] = observers.rx
+    arrays["heard"][:len(core.heard)] = core.heard
+
+    history_t, history_x, history_y = core.source_history.window()
+    count = len(history_t)
+    arrays["history_t"][:count] = history_t
+    arrays["history_x"][:count] = history_x
+    arrays["history_y"][:count] = history_y
+    arrays["counts"][:] = (n, len(emitters), len(observers), count)
+    state.end_write()
+
+
+def apply_snapshot(snapshot, sim):
+    """Load a snapshot from SharedState.read() into a DopplerSimulation
+    so its usual render_scene() draws it"""
+    for name, value in zip(SCALARS, snapshot["scalars"].tolist()):
+        setattr(sim, name, value)
+    n, emitter_count, observer_count, history_count = snapshot["counts"].tolist()
+
+    # Oldest first from slot 0, as WaveStore keeps them after a grow
+    waves = sim.waves
+    waves.center_x, waves.center_y = snapshot["wave_x"], snapshot["wave_y"]
+    if len(waves.birth_time) != SHARED_WAVES:
+        waves.birth_time = np.zeros(SHARED_WAVES)  # not drawn; kept for the length
+    waves.capacity, waves.head, waves.count = SHARED_WAVES, 0, n
+    waves.radius, waves.alpha = snapshot["wave_radius"][:n], snapshot["wave_alpha"][:n]
+
+    sim.emitters.position = snapshot["emitter_position"][:emitter_count]
+    sim.emitters.rx = snapshot["emitter_rx"][:emitter_count]
+    sim.observers.position = snapshot["observer_position"][:observer_count]
+    sim.observers.rx = snapshot["observer_rx"][:observer_count]
+    sim.heard = snapshot["heard"][:observer_count + 1]
+
+    # Both halves of the mirrored ring, so window() returns these samples
+    history = sim.source_history
+    for column, samples in ((history.t, snapshot["history_t"]), (history.x, snapshot["history_x"]),
+                            (history.y, snapshot["history_y"])):
+        column[:history_count] = samples[:history_count]
+        column[history.capacity:history.capacity + history_count] = samples[:history_count]
+    history.count = history_count
+    history.next_slot = history_count % history.capacity
+
+
+def worker_main(state_name, layout, commands, sound_enabled):
+    """Worker process: step, publish and mix until told to stop"""
+    import pygame
+
+    import DOPPLE_EFFECT
+    from sim_input import InputState
+
+    state = SharedState(layout, state_name)
+    core = DOPPLE_EFFECT.DopplerCore()
+    generator = DOPPLE_EFFECT.SoundGenerator(streaming=True)
+    pygame.mixer.init(**DOPPLE_EFFECT.MIXER_SETTINGS)
+
+    dt = DOPPLE_EFFECT.FIXED_DT
+    latest = InputState((core.source_x, core.source_y))
+    buttons_down, buttons_up, keys_down = [], [], []
+    next_step = time.perf_counter()
+    running = True
+    while running:
+        # Everything the window sent since the last pass; presses wait for the next step
+        while True:
+            try:
+                kind, value = commands.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "input":
+                latest = value
+                buttons_down.extend(value.buttons_down)
+                buttons_up.extend(value.buttons_up)
+                keys_down.extend(value.keys_down)
+            elif kind == "sound":
+                sound_enabled = value
+                if not sound_enabled:
+                    generator.stop()
+            elif kind == "stop":
+                running = False
+
+        now = time.perf_counter()
+        steps = 0
+        while next_step <= now and steps < DOPPLE_EFFECT.MAX_STEPS_PER_FRAME:
+            core.step(dt, InputState(latest.mouse_pos, buttons_down, buttons_up, keys_down,
+                                     latest.mouse_velocity))
+            buttons_down, buttons_up, keys_down = [], [], []
+            next_step += dt
+            steps += 1
+        if steps == DOPPLE_EFFECT.MAX_STEPS_PER_FRAME:
+            next_step = max(next_step, now)  # Too far behind; drop the backlog
+        if steps:
+            publish(state, core)
+            if sound_enabled:
+                generator.update_voices(*core.voice_geometry())
+                generator.start_stream()
+        time.sleep(max(0.0, next_step - time.perf_counter()))
+
+    generator.stop()
+    state.close()
+
+
+class SimWorker:
+    """Main-process handle on the worker: send input, read snapshots"""
+
+    def __init__(self, max_emitters, max_observers, history_steps, sound_enabled=True):
+        layout = snapshot_layout(max_emitters, max_observers, history_steps)
+        self.state = SharedState(layout)
+        context = spawn_context()
+        self.commands = context.Queue()
+        self.process = context.Process(target=worker_main, name="SimWorker", daemon=True,
+                                       args=(self.state.name, layout, self.commands, sound_enabled))
+        self.process.start()
+
+    def send_input(self, input_state):
+        self.commands.put_nowait(("input", input_state))
+
+    def set_sound(self, enabled):
+        self.commands.put_nowait(("sound", enabled))
+
+    def read_into(self, sim):
+        """Load the newest snapshot into sim; False if there was none"""
+        snapshot = self.state.read()
+        if snapshot is None:
+            return False
+        apply_snapshot(snapshot, sim)
+        return True
+
+    def stop(self):
+        self.commands.put_nowait(("stop", None))
+        self.process.join(WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.commands.close()
+        self.state.close()
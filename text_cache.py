@@ -0,0 +1,83 @@
+"""Cached text rendering for the HUDs and menus.
+
+font.render() rasterises the string every call, which dominates the HUD
+cost when most of the text never changes. TextCache keeps rendered
+surfaces in a bounded LRU, TextLabel re-renders a single changing readout
+only when its formatted string changes, and render_panel pre-composites a
+block of static lines into one surface.
+"""
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_SIZE = 256  # rendered strings kept before the oldest is evicted
+
+
+class TextCache:
+    """LRU of rendered text keyed by (font, text, color, antialias)"""
+
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        """Same arguments as font.render(); the result must not be modified"""
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+class TextLabel:
+    """One changing readout: re-rendered only when its string changes"""
+
+    def __init__(self, font, antialias=True):
+        self.font = font
+        self.antialias = antialias
+        self.text = None
+        self.color = None
+        self.surface = None
+
+    def render(self, text, color):
+        if text != self.text or color != self.color:
+            self.text = text
+            self.color = color
+            self.surface = self.font.render(text, self.antialias, color)
+        return self.surface
+
+
+def render_panel(font, lines, color, line_height, antialias=True):
+    """Pre-composite static lines into one transparent surface.
+
+    Empty strings leave a blank row, so callers can blit changing values
+    into those rows themselves.
+    """
+    rendered = [font.render(line, antialias, color) if line else None for line in lines]
+    width = max((text.get_width() for text in rendered if text), default=1)
+    height = line_height * (len(lines) - 1) + font.get_height()
+    panel = pygame.Surface((width, height), pygame.SRCALPHA)
+    for row, text in enumerate(rendered):
+        if text:
+            # Rows do not overlap, so MAX copies each line's pixels unchanged
+            panel.blit(text, (0, row * line_height), special_flags=pygame.BLEND_RGBA_MAX)
+    # The panel never changes and is mostly transparent: RLE skips the gaps
+    panel.set_alpha(255, pygame.RLEACCEL)
+    return panel
+
+
+# Shared by everything that draws text
+text_cache = TextCache()